@@ -10,12 +10,19 @@ import os
 from pathlib import Path
 from datetime import datetime
 
+from watch_tests import TestWatcher
+
 def main():
     """Lance les tests unitaires rapidement"""
     
     plugin_dir = Path(__file__).parent
     os.chdir(plugin_dir)
     
+    # python quick_test.py watch : relance incrémentale à chaque sauvegarde
+    if len(sys.argv) > 1 and sys.argv[1].lower() == "watch":
+        TestWatcher(plugin_dir).watch()
+        return 0
+    
     print("🚀 Tests unitaires rapides - WC Qualiopi Steps")
     print("-" * 50)
     
@@ -4,22 +4,41 @@ Script pour lancer les tests unitaires avec génération de rapports
 Compatible avec VS Code "Run" button et génération automatique de rapports JSON/HTML
 """
 
+import argparse
+import hashlib
+import shutil
 import subprocess
 import json
 import os
 import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 import re
 
+from watch_tests import TestWatcher
+
+# Séquences ANSI émises par Pest (couleurs des badges PASS/FAIL)
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+
 class TestRunner:
     def __init__(self):
         self.plugin_dir = Path(__file__).parent
         self.reports_dir = self.plugin_dir / "test_reports"
         self.reports_dir.mkdir(exist_ok=True)
+        self.quarantine_file = self.plugin_dir / "tests" / "flaky_quarantine.json"
+        self.php_binary = "php"
+        self.matrix_dir = self.plugin_dir / ".matrix"
         
-    def run_tests(self, test_type="all"):
-        """Lance les tests et génère les rapports"""
+    def run_tests(self, test_type="all", reruns=0, strict=False):
+        """Lance les tests et génère les rapports
+        
+        reruns > 0 : relance chaque test échoué N fois en parallèle pour
+        distinguer les échecs constants des tests instables (flaky).
+        strict : les tests en quarantaine font échouer le run.
+        """
         
         print("Lancement des tests unitaires WC Qualiopi Steps...")
         print("=" * 60)
@@ -64,13 +83,51 @@ class TestRunner:
                 'test_type': test_name
             })
             
+            # Quarantaine connue avant ce run : seule elle peut rendre un échec non bloquant
+            known_quarantine = self._load_quarantine()
+            quarantine = dict(known_quarantine)
+            
+            # Relancer tous les échecs, quarantaine comprise, ainsi que les tests en
+            # quarantaine passés dans ce run : une entrée est réévaluée à chaque fois
+            # (maintenue, retirée si réparée, ou rendue bloquante si l'échec est constant)
+            test_results['flaky_analysis'] = []
+            if reruns > 0:
+                failed_ids = {t['id'] for t in test_results['failed_tests']}
+                passing_quarantined = [
+                    {'id': test_id, 'suite': entry['suite'], 'test': entry['test'],
+                     'file': entry['file'], 'initial_failed': False}
+                    for test_id, entry in quarantine.items()
+                    if test_id not in failed_ids and self._in_scope(entry['file'], test_type)
+                ]
+                to_check = test_results['failed_tests'] + passing_quarantined
+                if to_check:
+                    test_results['flaky_analysis'] = self.detect_flaky(to_check, reruns)
+                    quarantine = self._update_quarantine(quarantine, test_results['flaky_analysis'])
+            
+            # Échecs connus (en quarantaine avant le run et après réévaluation)
+            # séparés des nouveaux échecs ; un test mis en quarantaine par ce run
+            # reste bloquant jusqu'au run suivant
+            test_results['quarantined'] = [
+                t for t in test_results['failed_tests']
+                if t['id'] in known_quarantine and t['id'] in quarantine
+            ]
+            
             # Générer les rapports
             self._generate_reports(test_results)
             
             # Afficher le résumé
             self._display_summary(test_results)
             
-            return result.returncode == 0
+            if result.returncode == 0:
+                return True
+            
+            # Un run ne contenant que des échecs en quarantaine reste vert (hors mode strict)
+            quarantined_ids = {t['id'] for t in test_results['quarantined']}
+            blocking = [
+                t for t in test_results['failed_tests']
+                if strict or t['id'] not in quarantined_ids
+            ]
+            return bool(test_results['failed_tests']) and not blocking
             
         except Exception as e:
             print(f"❌ Erreur lors de l'exécution: {e}")
@@ -82,18 +139,23 @@ class TestRunner:
         results = {
             'passed': 0,
             'failed': 0,
+            'skipped': 0,
+            'risky': 0,
+            'incomplete': 0,
+            'todos': 0,
             'total': 0,
             'assertions': 0,
             'success_rate': 0.0,
             'errors': [],
             'output': stdout,
             'stderr': stderr,
-            'test_details': []
+            'test_details': [],
+            'failed_tests': self._parse_failed_tests(stdout)
         }
         
         # Patterns pour parser la sortie Pest
         patterns = {
-            'test_summary': r'Tests:\s*(\d+)\s*passed(?:,\s*(\d+)\s*failed)?\s*\((\d+)\s*assertions\)',
+            'test_summary': r'Tests:\s*(.+?)\s*\((\d+)\s*assertions\)',
             'failed_test': r'FAILED\s+(.+?)\s+>\s+(.+?)\s+Error',
             'passed_test': r'✓\s+(.+?)(?:\s+[\d.]+s)?\s*$',
             'duration': r'Duration:\s+([\d.]+)s'
@@ -102,13 +164,24 @@ class TestRunner:
         # Extraire le résumé des tests
         summary_match = re.search(patterns['test_summary'], stdout)
         if summary_match:
-            results['passed'] = int(summary_match.group(1))
-            results['failed'] = int(summary_match.group(2) or 0)
-            results['assertions'] = int(summary_match.group(3))
-            results['total'] = results['passed'] + results['failed']
+            # "1 failed, 2 skipped, 1 risky, 9 passed" (ordre variable selon la version de Pest)
+            counts = {
+                status.lower(): int(count)
+                for count, status in re.findall(r'(\d+)\s+([a-zA-Z]+)', summary_match.group(1))
+            }
+            results['passed'] = counts.get('passed', 0)
+            results['failed'] = counts.get('failed', 0)
+            results['skipped'] = counts.get('skipped', 0)
+            results['risky'] = counts.get('risky', 0)
+            results['incomplete'] = counts.get('incomplete', 0)
+            results['todos'] = counts.get('todos', counts.get('todo', 0))
+            results['assertions'] = int(summary_match.group(2))
+            results['total'] = sum(counts.values())
             
-            if results['total'] > 0:
-                results['success_rate'] = (results['passed'] / results['total']) * 100
+            # Taux calculé sur les tests exécutés (ignorés / todo exclus)
+            executed = results['passed'] + results['failed'] + results['risky']
+            if executed > 0:
+                results['success_rate'] = (results['passed'] / executed) * 100
         
         # Extraire les tests échoués
         for match in re.finditer(patterns['failed_test'], stdout, re.MULTILINE):
@@ -127,6 +200,390 @@ class TestRunner:
         
         return results
     
+    def _parse_failed_tests(self, stdout):
+        """Extrait les tests échoués par fichier à partir des blocs PASS/FAIL de Pest"""
+        
+        failed = []
+        current_suite = None
+        
+        for line in ANSI_ESCAPE.sub('', stdout).splitlines():
+            header = re.match(r'^\s*(?:PASS|FAIL)\s+(Tests\\\S+)', line)
+            if header:
+                current_suite = header.group(1)
+                continue
+            
+            failure = re.match(r'^\s*⨯\s+(.+?)(?:\s{2,}[\d.]+s)?\s*$', line)
+            if failure and current_suite:
+                name = failure.group(1).strip()
+                failed.append({
+                    'id': f"{current_suite} > {name}",
+                    'suite': current_suite,
+                    'test': name,
+                    'file': self._suite_to_file(current_suite)
+                })
+        
+        return failed
+    
+    def _in_scope(self, test_file, test_type):
+        """Le fichier de test fait-il partie de la suite lancée ?"""
+        
+        folders = {
+            'unit': ('tests/Unit',),
+            'integration': ('tests/Integration',)
+        }.get(test_type)
+        if folders is None:
+            return (self.plugin_dir / test_file).exists()
+        return Path(test_file).as_posix().startswith(folders) and (self.plugin_dir / test_file).exists()
+    
+    def _suite_to_file(self, suite):
+        """Tests\\Unit\\MappingTest -> tests/Unit/MappingTest.php"""
+        
+        parts = suite.split('\\')
+        return str(Path('tests', *parts[1:]).with_suffix('.php'))
+    
+    def _pest_command(self, *args):
+        """Commande Pest directe (sans surcoût Composer)"""
+        
+        return [self.php_binary, str(Path('vendor') / 'bin' / 'pest'), '--colors=never', *args]
+    
+    def detect_flaky(self, failed_tests, reruns=5, workers=None):
+        """Relance chaque test échoué N fois dans des processus isolés et parallèles
+        
+        Classification :
+        - 'consistent' : échoue à chaque relance
+        - 'flaky'      : passe au moins une fois (taux d'échec observé)
+        - 'fixed'      : test en quarantaine passé dans le run et à chaque relance
+        - 'unverified' : aucune relance n'a exécuté exactement ce test (filtre
+          sans correspondance, test ignoré...) ; la quarantaine n'est pas modifiée
+        
+        Un test avec 'initial_failed': False (quarantaine passée dans le run)
+        ne compte pas le run initial comme un échec. Les relances qui n'ont pas
+        exécuté exactement un test ne comptent pas comme observations.
+        """
+        
+        print(f"\n🔁 Relance de {len(failed_tests)} test(s) échoué(s) ou en quarantaine × {reruns}...")
+        
+        jobs = [(test, attempt) for test in failed_tests for attempt in range(reruns)]
+        workers = workers or min(len(jobs), os.cpu_count() or 4)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(lambda job: self._rerun_test(*job), jobs))
+        
+        analysis = []
+        for test in failed_tests:
+            runs = [
+                passed for (job_test, _), passed in zip(jobs, outcomes)
+                if job_test is test and passed is not None
+            ]
+            initial_failed = test.get('initial_failed', True)
+            # Le run initial compte comme une observation
+            failures = int(initial_failed) + runs.count(False)
+            attempts = 1 + len(runs)
+            if not runs:
+                classification = 'unverified'
+            elif failures == 0:
+                classification = 'fixed'
+            elif failures == attempts:
+                classification = 'consistent'
+            else:
+                classification = 'flaky'
+            analysis.append({
+                **test,
+                'reruns': len(runs),
+                'rerun_failures': runs.count(False),
+                'failure_rate': failures / attempts,
+                'classification': classification
+            })
+        
+        return analysis
+    
+    def _rerun_test(self, test, attempt):
+        """Exécute un seul test dans un processus isolé (répertoire temporaire dédié)
+        
+        Retourne True/False selon le résultat, ou None si la relance n'a pas
+        exécuté exactement ce test (nombre lu dans le rapport JUnit).
+        """
+        
+        description = test['test'].split('→')[-1].strip()
+        # Pest 2 filtre sur le nom de méthode généré (Str::evaluable) : accepter les deux formes
+        name_filter = f"(?:{re.escape(description)}|{re.escape(self._pest_method_name(description))})"
+        
+        with tempfile.TemporaryDirectory(prefix=f"wcqs-rerun-{attempt}-") as tmp_dir:
+            junit = Path(tmp_dir) / 'junit.xml'
+            cmd = self._pest_command(test['file'], '--filter', name_filter, '--log-junit', str(junit))
+            env = {**os.environ, 'TMPDIR': tmp_dir, 'TMP': tmp_dir, 'TEMP': tmp_dir}
+            try:
+                subprocess.run(
+                    cmd,
+                    cwd=self.plugin_dir,
+                    env=env,
+                    capture_output=True,
+                    text=True,
+                    encoding='utf-8',
+                    errors='replace'
+                )
+                return self._junit_single_outcome(junit)
+            except OSError:
+                return None
+    
+    def _pest_method_name(self, description):
+        """Nom de méthode généré par Pest 2 pour une description (Str::evaluable, sans préfixe)"""
+        
+        name = description.replace('_', '__').replace(' ', '_')
+        return re.sub(r'[^a-zA-Z0-9_\x80-\U0010ffff]', '_', name)
+    
+    def _junit_single_outcome(self, junit):
+        """Résultat de l'unique test d'un rapport JUnit, None s'il n'en contient pas exactement un"""
+        
+        try:
+            testcases = ET.parse(junit).getroot().findall('.//testcase')
+        except (OSError, ET.ParseError):
+            return None
+        
+        if len(testcases) != 1 or testcases[0].find('skipped') is not None:
+            return None
+        return testcases[0].find('failure') is None and testcases[0].find('error') is None
+    
+    def _load_quarantine(self):
+        """Charge la liste persistante des tests instables connus"""
+        
+        if not self.quarantine_file.exists():
+            return {}
+        
+        try:
+            with open(self.quarantine_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _update_quarantine(self, quarantine, analysis):
+        """Met en quarantaine les tests flaky, retire ceux qui échouent systématiquement ou sont réparés"""
+        
+        now = datetime.now().isoformat()
+        
+        for entry in analysis:
+            if entry['classification'] == 'unverified':
+                continue  # aucune observation exploitable : entrée laissée telle quelle
+            if entry['classification'] == 'flaky':
+                known = quarantine.get(entry['id'], {})
+                quarantine[entry['id']] = {
+                    'suite': entry['suite'],
+                    'test': entry['test'],
+                    'file': entry['file'],
+                    'failure_rate': entry['failure_rate'],
+                    'first_seen': known.get('first_seen', now),
+                    'last_seen': now
+                }
+            else:
+                quarantine.pop(entry['id'], None)
+        
+        with open(self.quarantine_file, 'w', encoding='utf-8') as f:
+            json.dump(quarantine, f, indent=2, ensure_ascii=False)
+        
+        return quarantine
+    
+    def find_php_binaries(self):
+        """Détecte les binaires php8.x installés (php8.1, php8.2, php8.3...)"""
+        
+        binaries = {}
+        search_dirs = os.environ.get('PATH', '').split(os.pathsep) + ['/usr/bin', '/usr/local/bin']
+        
+        for directory in search_dirs:
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                match = re.fullmatch(r'php(8\.\d+)', name)
+                if match and match.group(1) not in binaries:
+                    path = os.path.join(directory, name)
+                    if os.access(path, os.X_OK):
+                        binaries[match.group(1)] = path
+        
+        return dict(sorted(binaries.items(), key=lambda item: tuple(map(int, item[0].split('.')))))
+    
+    def _prepare_matrix_workspace(self, version, php_path):
+        """Espace isolé par version : sources synchronisées, vendor/ et cache Composer dédiés
+        
+        Le vendor/ n'est reconstruit que si composer.json/composer.lock changent.
+        """
+        
+        workspace = self.matrix_dir / f"php{version}"
+        workspace.mkdir(parents=True, exist_ok=True)
+        
+        # tests/bootstrap.php charge __DIR__/../vendor : copier (et non lier) src/ et tests/
+        # Copie repartie de zéro : un fichier supprimé ou renommé ne doit pas survivre (seul vendor/ est conservé)
+        for folder in ('src', 'tests'):
+            if (workspace / folder).exists():
+                shutil.rmtree(workspace / folder)
+            shutil.copytree(self.plugin_dir / folder, workspace / folder)
+        for filename in ('composer.json', 'composer.lock', 'phpunit.xml'):
+            if (self.plugin_dir / filename).exists():
+                shutil.copy2(self.plugin_dir / filename, workspace / filename)
+        
+        fingerprint = hashlib.sha256()
+        for filename in ('composer.json', 'composer.lock'):
+            if (workspace / filename).exists():
+                fingerprint.update((workspace / filename).read_bytes())
+        fingerprint = fingerprint.hexdigest()
+        
+        stamp = workspace / ".vendor_stamp"
+        if (workspace / 'vendor').exists() and stamp.exists() and stamp.read_text() == fingerprint:
+            return workspace, None
+        
+        composer = shutil.which('composer')
+        if not composer:
+            return workspace, "composer introuvable"
+        
+        result = subprocess.run(
+            [php_path, composer, 'install', '--no-interaction', '--prefer-dist', '--no-progress'],
+            cwd=workspace,
+            env={**os.environ, 'COMPOSER_CACHE_DIR': str(workspace / '.composer-cache')},
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace'
+        )
+        if result.returncode != 0:
+            return workspace, result.stderr.strip() or "composer install a échoué"
+        
+        stamp.write_text(fingerprint)
+        return workspace, None
+    
+    def _setup_matrix_entry(self, version, php_path):
+        """Prépare l'espace d'une version (copie des sources, vendor/ si nécessaire)"""
+        
+        entry = {'version': version, 'php': php_path, 'setup_duration': 0.0, 'duration': 0.0}
+        
+        setup_start = datetime.now()
+        workspace, error = self._prepare_matrix_workspace(version, php_path)
+        entry['setup_duration'] = (datetime.now() - setup_start).total_seconds()
+        entry['workspace'] = str(workspace)
+        
+        if error:
+            entry.update({'success': False, 'error': error, 'passed': 0, 'failed': 0,
+                          'skipped': 0, 'risky': 0, 'failed_tests': []})
+        return entry
+    
+    def _run_matrix_entry(self, entry, test_path):
+        """Lance la suite Pest dans l'espace préparé d'une version"""
+        
+        php_path = entry['php']
+        workspace = Path(entry['workspace'])
+        
+        cmd = [php_path, str(Path('vendor') / 'bin' / 'pest'), '--colors=never']
+        if test_path:
+            cmd.append(test_path)
+        
+        tmp_dir = workspace / '.tmp'
+        tmp_dir.mkdir(exist_ok=True)
+        
+        start = datetime.now()
+        result = subprocess.run(
+            cmd,
+            cwd=workspace,
+            env={**os.environ, 'TMPDIR': str(tmp_dir), 'TMP': str(tmp_dir), 'TEMP': str(tmp_dir)},
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace'
+        )
+        entry['duration'] = (datetime.now() - start).total_seconds()
+        
+        parsed = self._parse_test_output(result.stdout, result.stderr)
+        entry.update({
+            'success': result.returncode == 0,
+            'exit_code': result.returncode,
+            'passed': parsed['passed'],
+            'failed': parsed['failed'],
+            'skipped': parsed['skipped'],
+            'risky': parsed['risky'],
+            'assertions': parsed['assertions'],
+            'failed_tests': [t['id'] for t in parsed['failed_tests']],
+            'output': result.stdout
+        })
+        return entry
+    
+    def run_matrix(self, test_type="all"):
+        """Lance la suite sur toutes les versions PHP 8.x installées
+        
+        Les espaces sont préparés en parallèle, mais les suites tournent l'une
+        après l'autre : des durées mesurées en concurrence ne seraient pas comparables.
+        """
+        
+        print("Matrice multi-versions PHP - WC Qualiopi Steps")
+        print("=" * 60)
+        
+        binaries = self.find_php_binaries()
+        if not binaries:
+            print("❌ Aucun binaire php8.x trouvé dans le PATH")
+            return False
+        
+        print(f"Versions détectées: {', '.join(binaries)}")
+        
+        test_path = {'unit': 'tests/Unit', 'integration': 'tests/Integration'}.get(test_type)
+        start_time = datetime.now()
+        
+        with ThreadPoolExecutor(max_workers=len(binaries)) as executor:
+            entries = list(executor.map(lambda item: self._setup_matrix_entry(*item), binaries.items()))
+        
+        for entry in entries:
+            if not entry.get('error'):
+                print(f"▶️  PHP {entry['version']}...")
+                self._run_matrix_entry(entry, test_path)
+        
+        timed = [e['duration'] for e in entries if e['success'] or e['passed'] or e['failed']]
+        fastest = min(timed) if timed else 0
+        for entry in entries:
+            entry['relative_duration'] = entry['duration'] / fastest if fastest else None
+        
+        report = {
+            'timestamp': start_time.isoformat(),
+            'test_type': test_type,
+            'duration': (datetime.now() - start_time).total_seconds(),
+            'versions': entries
+        }
+        
+        json_file = self.reports_dir / f"matrix_results_{start_time.strftime('%Y%m%d_%H%M%S')}.json"
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        
+        self._display_matrix(report)
+        print(f"\nRapport matrice: {json_file}")
+        
+        return all(entry['success'] for entry in entries)
+    
+    def _display_matrix(self, report):
+        """Affiche le tableau pass/fail et durées par version"""
+        
+        print("\n" + "=" * 60)
+        print("📊 MATRICE PHP")
+        print("=" * 60)
+        print(f"{'Version':<10}{'Statut':<10}{'Réussis':>9}{'Échoués':>9}{'Ignorés':>9}{'Risqués':>9}"
+              f"{'Durée':>10}{'Relatif':>9}")
+        
+        for entry in report['versions']:
+            status = "✅ OK" if entry['success'] else "❌ KO"
+            relative = f"×{entry['relative_duration']:.2f}" if entry.get('relative_duration') else "-"
+            print(f"{entry['version']:<10}{status:<10}{entry['passed']:>9}{entry['failed']:>9}"
+                  f"{entry.get('skipped', 0):>9}{entry.get('risky', 0):>9}"
+                  f"{entry['duration']:>9.2f}s{relative:>9}")
+            if entry.get('error'):
+                print(f"   ⚠️  {entry['error']}")
+        
+        # Échecs propres à certaines versions seulement
+        all_versions = {entry['version'] for entry in report['versions']}
+        failures = {}
+        for entry in report['versions']:
+            for test_id in entry['failed_tests']:
+                failures.setdefault(test_id, set()).add(entry['version'])
+        specific = {t: v for t, v in failures.items() if v != all_versions}
+        
+        if specific:
+            print("\n⚠️  Échecs spécifiques à une version:")
+            for test_id, versions in sorted(specific.items()):
+                print(f"   - [{', '.join(sorted(versions))}] {test_id}")
+        
+        print("=" * 60)
+    
     def _generate_reports(self, results):
         """Génère les rapports JSON et HTML"""
         
@@ -241,6 +698,29 @@ class TestRunner:
                 """
             html += "</div></div>"
         
+        # Section des tests instables / en quarantaine
+        if results.get('flaky_analysis') or results.get('quarantined'):
+            html += """
+        <div class="section">
+            <h2>🔁 Tests Instables</h2>
+            """
+            for entry in results.get('flaky_analysis', []):
+                html += f"""
+                <div class="error-item">
+                    <strong>{entry['suite']}</strong> → {entry['test']}
+                    <span class="failure-badge">{entry['classification'].upper()}</span>
+                    taux d'échec : {entry['failure_rate'] * 100:.0f}% ({entry['rerun_failures']}/{entry['reruns']} relances)
+                </div>
+                """
+            for entry in results.get('quarantined', []):
+                html += f"""
+                <div class="error-item">
+                    <strong>{entry['suite']}</strong> → {entry['test']}
+                    <span class="success-badge">QUARANTAINE</span>
+                </div>
+                """
+            html += "</div>"
+        
         # Section de la sortie
         html += f"""
         <div class="section">
@@ -269,10 +749,24 @@ class TestRunner:
         print("=" * 60)
         print(f"✅ Tests réussis:     {results['passed']}")
         print(f"❌ Tests échoués:     {results['failed']}")
+        if results.get('skipped') or results.get('risky'):
+            print(f"⏭️  Ignorés / risqués: {results.get('skipped', 0)} / {results.get('risky', 0)}")
         print(f"📈 Taux de réussite:  {results['success_rate']:.1f}%")
         print(f"🔍 Assertions:        {results['assertions']}")
         print(f"⏱️  Durée:            {results['duration']:.2f}s")
         
+        if results.get('quarantined'):
+            print(f"\n🧊 En quarantaine (instables connus): {len(results['quarantined'])}")
+            for entry in results['quarantined']:
+                print(f"   - {entry['id']}")
+        
+        if results.get('flaky_analysis'):
+            print("\n🔁 Analyse des relances:")
+            for entry in results['flaky_analysis']:
+                icon = {'consistent': "❌", 'fixed': "✅", 'unverified': "❔"}.get(entry['classification'], "⚠️")
+                print(f"   {icon} [{entry['classification']}] {entry['id']} "
+                      f"(taux d'échec {entry['failure_rate'] * 100:.0f}%)")
+        
         if results['failed'] == 0:
             print("\n🎉 TOUS LES TESTS SONT PASSÉS !")
         else:
@@ -283,17 +777,34 @@ class TestRunner:
 def main():
     """Point d'entrée principal"""
     
+    parser = argparse.ArgumentParser(description="Tests WC Qualiopi Steps avec rapports")
+    parser.add_argument("test_type", nargs="?", default="all", type=str.lower,
+                        choices=["unit", "integration", "all", "watch", "matrix"],
+                        help="watch : relance à chaque sauvegarde ; matrix : la suite sur chaque "
+                             "php8.x installé, une version après l'autre (espaces préparés en parallèle)")
+    parser.add_argument("--suite", default="all", type=str.lower,
+                        choices=["unit", "integration", "all"],
+                        help="Suite à lancer en mode matrix (exécutée séquentiellement par version)")
+    parser.add_argument("--reruns", type=int, default=0,
+                        help="Relancer chaque test échoué N fois pour détecter les tests instables")
+    parser.add_argument("--strict", action="store_true",
+                        help="Les tests en quarantaine font échouer le run")
+    args = parser.parse_args()
+    
     runner = TestRunner()
     
-    # Déterminer le type de test à partir des arguments
-    test_type = "all"
-    if len(sys.argv) > 1:
-        arg = sys.argv[1].lower()
-        if arg in ["unit", "integration", "all"]:
-            test_type = arg
+    # Mode watch : relance incrémentale à chaque sauvegarde
+    if args.test_type == "watch":
+        TestWatcher(runner.plugin_dir, runner.php_binary).watch()
+        sys.exit(0)
+    
+    # Mode matrix : toutes les versions php8.x installées, l'une après l'autre
+    # (seule la préparation des espaces .matrix/ est parallèle)
+    if args.test_type == "matrix":
+        sys.exit(0 if runner.run_matrix(args.suite) else 1)
     
     # Lancer les tests
-    success = runner.run_tests(test_type)
+    success = runner.run_tests(args.test_type, reruns=args.reruns, strict=args.strict)
     
     # Code de sortie
     sys.exit(0 if success else 1)
@@ -84,7 +84,7 @@ class WCQS_Token {
 		// Séparer payload et signature
 		$parts = explode( '.', $token );
 		if ( count( $parts ) !== 2 ) {
-			return false;
+			return self::reject( 'malformed', $expected_user_id, $expected_product_id );
 		}
 
 		list( $encoded_payload, $signature ) = $parts;
@@ -105,18 +105,18 @@ class WCQS_Token {
 		}
 
 		if ( ! $is_valid ) {
-			return false;
+			return self::reject( 'signature', $expected_user_id, $expected_product_id );
 		}
 
 		// Décoder payload
 		$payload = self::base64url_decode( $encoded_payload );
 		if ( false === $payload ) {
-			return false;
+			return self::reject( 'payload', $expected_user_id, $expected_product_id );
 		}
 
 		$parts = explode( ':', $payload );
 		if ( count( $parts ) !== 4 ) {
-			return false;
+			return self::reject( 'payload', $expected_user_id, $expected_product_id );
 		}
 
 		list( $user_id, $product_id, $timestamp, $nonce ) = $parts;
@@ -128,12 +128,12 @@ class WCQS_Token {
 
 		// Vérifier correspondance user_id et product_id
 		if ( $user_id !== $expected_user_id || $product_id !== $expected_product_id ) {
-			return false;
+			return self::reject( 'mismatch', $expected_user_id, $expected_product_id );
 		}
 
 		// Vérifier TTL
 		if ( ( time() - $timestamp ) > $max_age ) {
-			return false;
+			return self::reject( 'expired', $expected_user_id, $expected_product_id );
 		}
 
 		return array(
@@ -145,6 +145,25 @@ class WCQS_Token {
 		);
 	}
 
+	/**
+	 * Journalise un refus de jeton (métrique wcqs_token_failures_total) et retourne false
+	 *
+	 * @param string $reason     malformed, signature, payload, mismatch ou expired
+	 * @param int    $user_id    Utilisateur attendu
+	 * @param int    $product_id Produit attendu
+	 * @return false
+	 */
+	private static function reject( string $reason, int $user_id, int $product_id ): bool {
+		if ( class_exists( '\\WcQualiopiSteps\\Utils\\WCQS_Logger' ) ) {
+			\WcQualiopiSteps\Utils\WCQS_Logger::get_instance()->warning( 'WCQS_Token: Verification failed', array(
+				'reason'     => $reason,
+				'user_id'    => $user_id,
+				'product_id' => $product_id,
+			) );
+		}
+		return false;
+	}
+
 	/**
 	 * Obtient la clé secrète (constante ou option)
 	 *
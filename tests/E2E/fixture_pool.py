@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool de sites WordPress + WooCommerce locaux pour les tests E2E
+
+Un site modèle est construit une seule fois (WordPress, WooCommerce, base
+SQLite, plugin activé comme via Activator::run), puis cloné pour chaque
+scénario : seul le code en lecture seule (cœur, extensions, thèmes) est lié
+en dur, tout le reste (base SQLite, uploads/, wp-config.php...) est copié. Des clones sont préparés à
+l'avance dans ready/ et réservés par un os.rename atomique, ce qui permet
+plusieurs runs E2E en parallèle (y compris entre processus) sans jamais
+toucher au site de production.
+
+Usage :
+    pool = WordPressFixturePool()
+    with pool.site() as site:
+        site.wp('option get wcqs_flags --format=json')
+"""
+
+import os
+import re
+import shlex
+import errno
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+
+PLUGIN_DIR = Path(__file__).resolve().parents[2]
+PLUGIN_SLUG = PLUGIN_DIR.name
+
+SQLITE_PLUGIN_URL = 'https://downloads.wordpress.org/plugin/sqlite-database-integration.latest-stable.zip'
+
+# Code jamais écrit en place : lié en dur. Tout le reste est copié, car un lien
+# dur partage l'inode (un debug.log ou une base liés seraient communs à tous les clones)
+READONLY_TREES = ('wp-admin/', 'wp-includes/', 'wp-content/plugins/', 'wp-content/themes/')
+
+# Fichiers propres à chaque site, non repris du modèle
+CLONE_EXCLUDED = ('debug.log',)
+
+# `wp db query` via $wpdb : même traducteur MySQL → SQLite que le site
+# (SQL transmis par variable d'environnement, sans échappement shell)
+WPDB_QUERY_PHP = (
+    'global $wpdb; '
+    'if ( false === $wpdb->query( getenv( "WCQS_FIXTURE_SQL" ) ) || $wpdb->last_error ) { '
+    'fwrite( STDERR, $wpdb->last_error ); exit( 1 ); } '
+    'if ( $wpdb->last_result ) { '
+    'echo implode( "\\t", array_keys( (array) $wpdb->last_result[0] ) ), "\\n"; '
+    'foreach ( $wpdb->last_result as $row ) { '
+    'echo implode( "\\t", array_map( "strval", (array) $row ) ), "\\n"; } }'
+)
+
+SERVER_START_ATTEMPTS = 5
+
+# WP_HOME / WP_SITEURL suivent le port attribué à chaque clone
+WP_CONFIG_EXTRA = """
+if ( getenv( 'WCQS_FIXTURE_URL' ) ) {
+	define( 'WP_HOME', getenv( 'WCQS_FIXTURE_URL' ) );
+	define( 'WP_SITEURL', getenv( 'WCQS_FIXTURE_URL' ) );
+}
+define( 'WP_DEBUG', true );
+define( 'WP_DEBUG_LOG', true );
+define( 'DISABLE_WP_CRON', true );
+"""
+
+
+def _free_port():
+    """Port libre à l'instant T : peut être pris avant `php -S`, d'où les reprises de start()"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _is_core_file(relative):
+    return '/' not in relative and relative.endswith('.php') and relative != 'wp-config.php'
+
+
+class FixtureSite:
+    """Clone de site réservé pour un scénario, servi par `php -S`
+
+    Expose execute_command() comme le connecteur SSH, pour être utilisable
+    tel quel par E2ETestFramework.
+    """
+
+    def __init__(self, path, php_binary='php', wp_cli='wp'):
+        self.path = Path(path)
+        self.php_binary = php_binary
+        self.wp_cli = wp_cli
+        self.port = None
+        self.url = None
+        self.server = None
+
+    @property
+    def env(self):
+        return {**os.environ, 'WCQS_FIXTURE_URL': self.url}
+
+    @property
+    def database_file(self):
+        return self.path / 'wp-content' / 'database' / '.ht.sqlite'
+
+    def start(self):
+        """Démarre `php -S`, avec un nouveau port si le précédent a été pris entre-temps"""
+        for _ in range(SERVER_START_ATTEMPTS):
+            self.port = _free_port()
+            self.url = f'http://127.0.0.1:{self.port}'
+            if self._start_server():
+                return self
+        raise RuntimeError(f"Le serveur PHP n'a pas démarré ({SERVER_START_ATTEMPTS} ports essayés)")
+
+    def _start_server(self):
+        self.server = subprocess.Popen(
+            [self.php_binary, '-S', f'127.0.0.1:{self.port}', '-t', str(self.path)],
+            cwd=self.path,
+            env=self.env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        # Attendre l'ouverture du port (quelques ms) ; un échec de bind (EADDRINUSE) termine php
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if self.server.poll() is not None:
+                self.server = None
+                return False
+            try:
+                with socket.create_connection(('127.0.0.1', self.port), timeout=0.1):
+                    pass
+            except OSError as error:
+                if error.errno not in (errno.ECONNREFUSED, errno.ETIMEDOUT, None):
+                    raise
+                time.sleep(0.01)
+                continue
+            # Le port répond : vérifier que c'est bien notre serveur et non un autre processus
+            time.sleep(0.05)
+            if self.server.poll() is None:
+                return True
+            self.server = None
+            return False
+        self.stop()
+        raise RuntimeError(f"Le serveur PHP n'a pas démarré sur le port {self.port}")
+
+    def stop(self):
+        if self.server and self.server.poll() is None:
+            self.server.terminate()
+            try:
+                self.server.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.server.kill()
+        self.server = None
+
+    def wp(self, command):
+        """Commande WP-CLI sur ce clone, retourne la sortie ou None en cas d'échec"""
+        if not command.startswith('wp '):
+            command = f'wp {command}'
+        if '--path=' not in command:
+            command = f'{command} --path={shlex.quote(str(self.path))}'
+        return self.execute_command(command)
+
+    def execute_command(self, command):
+        """Équivalent local de TBWebSSHConnector.execute_command"""
+        # Sans serveur MySQL, `wp db query` (client mysql) est rejoué via $wpdb
+        match = re.match(r'^wp db query "(.*)"(?: --path=\S+)?$', command, re.DOTALL)
+        if match:
+            return self.query(match.group(1).replace('\\"', '"'))
+
+        if command.startswith('wp ') and self.wp_cli != 'wp':
+            command = f'{self.wp_cli} {command[3:]}'
+
+        result = subprocess.run(
+            command,
+            shell=True,
+            cwd=self.path,
+            env=self.env,
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace'
+        )
+        if result.returncode != 0:
+            return None
+        return result.stdout
+
+    def query(self, sql):
+        """Requête SQL (dialecte MySQL) via $wpdb et le traducteur SQLite, sortie tabulée comme `wp db query`"""
+        result = subprocess.run(
+            [self.wp_cli, 'eval', WPDB_QUERY_PHP, f'--path={self.path}'],
+            cwd=self.path,
+            env={**self.env, 'WCQS_FIXTURE_SQL': sql},
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace'
+        )
+        if result.returncode != 0:
+            return None
+        return result.stdout
+
+    def disconnect(self):
+        self.stop()
+
+
+class WordPressFixturePool:
+    """Pool de clones prêts à l'emploi d'un site modèle pré-configuré"""
+
+    def __init__(self, pool_dir=None, size=4, php_binary='php', wp_cli='wp', seed_commands=None):
+        self.pool_dir = Path(pool_dir or Path.home() / '.cache' / 'wcqs-e2e-pool')
+        self.template_dir = self.pool_dir / 'template'
+        self.ready_dir = self.pool_dir / 'ready'
+        self.active_dir = self.pool_dir / 'active'
+        self.staging_dir = self.pool_dir / 'staging'
+        self.size = size
+        self.php_binary = php_binary
+        self.wp_cli = wp_cli
+        self.seed_commands = list(seed_commands or [])
+        self._refill_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Site modèle
+    # ------------------------------------------------------------------
+
+    def _run_wp(self, args, path):
+        result = subprocess.run(
+            [self.wp_cli, *args, f'--path={path}'],
+            env={**os.environ, 'WCQS_FIXTURE_URL': 'http://127.0.0.1'},
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace'
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"wp {' '.join(args)} : {result.stderr.strip()}")
+        return result.stdout
+
+    def _install_sqlite_dropin(self, path):
+        """Installe sqlite-database-integration et son db.php (avant toute connexion BDD)"""
+        plugins_dir = path / 'wp-content' / 'plugins'
+        archive = self.pool_dir / 'sqlite-database-integration.zip'
+        if not archive.exists():
+            urllib.request.urlretrieve(SQLITE_PLUGIN_URL, archive)
+        with zipfile.ZipFile(archive) as zip_file:
+            zip_file.extractall(plugins_dir)
+
+        plugin_path = plugins_dir / 'sqlite-database-integration'
+        dropin = (plugin_path / 'db.copy').read_text(encoding='utf-8')
+        dropin = dropin.replace('{SQLITE_IMPLEMENTATION_FOLDER_PATH}', str(plugin_path))
+        dropin = dropin.replace('{SQLITE_PLUGIN}', 'sqlite-database-integration/load.php')
+        (path / 'wp-content' / 'db.php').write_text(dropin, encoding='utf-8')
+        (path / 'wp-content' / 'database').mkdir(exist_ok=True)
+
+    def ensure_template(self):
+        """Construit le site modèle une seule fois (réutilisé ensuite)"""
+        stamp = self.template_dir / '.wcqs_template_ready'
+        if stamp.exists():
+            return self.template_dir
+
+        if self.template_dir.exists():
+            shutil.rmtree(self.template_dir)
+        self.template_dir.mkdir(parents=True)
+        path = self.template_dir
+
+        self._run_wp(['core', 'download', '--skip-content'], path)
+        self._run_wp([
+            'config', 'create', '--dbname=wordpress', '--dbuser=wcqs', '--dbpass=wcqs',
+            '--skip-check', f'--extra-php={WP_CONFIG_EXTRA}'
+        ], path)
+        (path / 'wp-content' / 'plugins').mkdir(parents=True, exist_ok=True)
+        (path / 'wp-content' / 'themes').mkdir(parents=True, exist_ok=True)
+        self._install_sqlite_dropin(path)
+
+        self._run_wp([
+            'core', 'install', '--url=http://127.0.0.1', '--title=WCQS Fixture',
+            '--admin_user=admin', '--admin_password=admin',
+            '--admin_email=admin@example.com', '--skip-email'
+        ], path)
+        self._run_wp(['theme', 'install', 'storefront', '--activate'], path)
+        self._run_wp(['plugin', 'install', 'woocommerce', '--activate'], path)
+        self._run_wp(['rewrite', 'structure', '/%postname%/'], path)
+
+        # Plugin lié symboliquement : le code courant est testé sans reconstruire le modèle
+        (path / 'wp-content' / 'plugins' / PLUGIN_SLUG).symlink_to(PLUGIN_DIR, target_is_directory=True)
+        self._run_wp(['plugin', 'activate', PLUGIN_SLUG], path)  # → Activator::run
+
+        for command in self.seed_commands:
+            self._run_wp(shlex.split(command), path)
+
+        stamp.write_text(time.strftime('%Y-%m-%dT%H:%M:%S'))
+        return self.template_dir
+
+    # ------------------------------------------------------------------
+    # Clones
+    # ------------------------------------------------------------------
+
+    def _clone(self):
+        """Clone du modèle : liens durs pour le code en lecture seule, copie réelle pour le reste"""
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        self.ready_dir.mkdir(parents=True, exist_ok=True)
+        target = self.staging_dir / f'site-{uuid.uuid4().hex[:12]}'
+        template = self.template_dir
+
+        def copy_or_link(src, dst):
+            relative = Path(src).relative_to(template).as_posix()
+            if not (relative.startswith(READONLY_TREES) or _is_core_file(relative)):
+                return shutil.copy2(src, dst)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+            return dst
+
+        shutil.copytree(template, target, symlinks=True, copy_function=copy_or_link,
+                        ignore=shutil.ignore_patterns(*CLONE_EXCLUDED))
+        (target / '.wcqs_template_ready').unlink(missing_ok=True)
+
+        # Publication atomique dans ready/
+        ready = self.ready_dir / target.name
+        os.rename(target, ready)
+        return ready
+
+    def refill(self):
+        """Complète ready/ jusqu'à `size` clones"""
+        with self._refill_lock:
+            while len(list(self.ready_dir.glob('site-*'))) < self.size:
+                self._clone()
+
+    def _refill_async(self):
+        threading.Thread(target=self.refill, daemon=True).start()
+
+    def acquire(self):
+        """Réserve un site propre et démarre son serveur PHP"""
+        self.ensure_template()
+        self.active_dir.mkdir(parents=True, exist_ok=True)
+        self.ready_dir.mkdir(parents=True, exist_ok=True)
+
+        site_path = None
+        for candidate in sorted(self.ready_dir.glob('site-*')):
+            destination = self.active_dir / candidate.name
+            try:
+                os.rename(candidate, destination)  # atomique : un seul processus gagne
+                site_path = destination
+                break
+            except OSError:
+                continue
+
+        if site_path is None:
+            fresh = self._clone()
+            site_path = self.active_dir / fresh.name
+            os.rename(fresh, site_path)
+
+        self._refill_async()
+        return FixtureSite(site_path, self.php_binary, self.wp_cli).start()
+
+    def release(self, site):
+        """Arrête le serveur et supprime le clone (en arrière-plan)"""
+        site.stop()
+        threading.Thread(target=shutil.rmtree, args=(site.path,), kwargs={'ignore_errors': True}, daemon=True).start()
+
+    @contextmanager
+    def site(self):
+        site = self.acquire()
+        try:
+            yield site
+        finally:
+            self.release(site)
+
+
+if __name__ == "__main__":
+    # Préparation du pool : modèle + clones prêts
+    pool = WordPressFixturePool(size=int(sys.argv[1]) if len(sys.argv) > 1 else 4)
+    print("🏗️  Construction du site modèle (une seule fois)...")
+    pool.ensure_template()
+    print("🧬 Préparation des clones...")
+    pool.refill()
+    print(f"✅ Pool prêt : {pool.ready_dir} ({pool.size} clones)")
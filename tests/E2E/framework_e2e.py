@@ -12,6 +12,7 @@ import sys
 import os
 import json
 import re
+import time
 from datetime import datetime
 from abc import ABC, abstractmethod
 
@@ -24,18 +25,43 @@ except ImportError as e:
     print(f"❌ Erreur d'import SSH: {e}")
     print("Framework E2E nécessite Access/ssh_access.py")
 
+# Historique des latences par commande (une ligne JSON par run)
+TIMINGS_TREND_FILE = 'e2e_timings_trend.jsonl'
+TREND_RUNS = 50
+
+
+def command_key(command_type, command):
+    """Clé stable d'une commande d'un run à l'autre (sans --path, espaces normalisés)"""
+    command = re.sub(r'\s--path=\S+', '', command)
+    return f"{command_type}: {' '.join(command.split())[:120]}"
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))]
+
+
 class E2ETestFramework(ABC):
     """
     Classe de base pour tous les tests E2E
     Fournit les outils communs : SSH, WP-CLI, observations utilisateur, rapports
     """
     
-    def __init__(self, test_name):
+    def __init__(self, test_name, fixture_pool=None):
         self.test_name = test_name
         self.ssh = None
         self.config = None
+        self.fixture_pool = fixture_pool
+        self.site = None
         self.start_time = datetime.now()
+        self.start_monotonic = time.monotonic()
         self.phases_completed = []
+        self.current_phase = None
+        self.connect_duration = None
+        self.command_timings = []
+        self.baseline_timings = {}
         self.report_data = {
             'meta': {'test_name': test_name},
             'phases': [],
@@ -80,20 +106,42 @@ class E2ETestFramework(ABC):
         """Connexion SSH standardisée"""
         try:
             self.log("Connexion SSH au serveur TB-Web...")
+            connect_start = time.monotonic()
             self.ssh = TBWebSSHConnector()
             
             if hasattr(self.ssh, 'connect_ssh') and callable(getattr(self.ssh, 'connect_ssh')):
                 if not self.ssh.connect_ssh():
                     raise Exception("Échec de connexion SSH")
             
-            self.log("Connexion SSH établie", "SUCCESS")
+            self.connect_duration = time.monotonic() - connect_start
+            self.log(f"Connexion SSH établie ({self.connect_duration:.2f}s)", "SUCCESS")
             return True
         except Exception as e:
             self.log(f"Erreur de connexion SSH: {e}", "ERROR")
             return False
 
+    def connect_local_site(self):
+        """Réserve un site local isolé dans le pool (remplace SSH + config)"""
+        try:
+            self.log("Réservation d'un site WordPress local...")
+            connect_start = time.monotonic()
+            self.site = self.fixture_pool.acquire()
+            self.connect_duration = time.monotonic() - connect_start
+            self.ssh = self.site
+            self.config = {'wordpress': {'wp_path': str(self.site.path)}}
+            self.log(f"Site local prêt : {self.site.url} (admin / admin)", "SUCCESS")
+            return True
+        except Exception as e:
+            self.log(f"Erreur pool de sites locaux: {e}", "ERROR")
+            return False
+
     def disconnect_ssh(self):
         """Déconnexion SSH propre"""
+        if self.site:
+            self.fixture_pool.release(self.site)
+            self.site = None
+            self.log("Site local libéré", "SUCCESS")
+            return
         try:
             if self.ssh and hasattr(self.ssh, 'disconnect'):
                 self.ssh.disconnect()
@@ -101,7 +149,7 @@ class E2ETestFramework(ABC):
         except Exception as e:
             self.log(f"Erreur déconnexion SSH: {e}", "WARNING")
 
-    def execute_wp_command(self, command):
+    def execute_wp_command(self, command, command_type='wp-cli'):
         """Commandes WP-CLI avec path automatique"""
         try:
             wp_path = self.config.get('wordpress', {}).get('wp_path', '/sites/tb-formation.fr/files')
@@ -111,12 +159,68 @@ class E2ETestFramework(ABC):
             if '--path=' not in command:
                 command = f'{command} --path={wp_path}'
             
-            output = self.ssh.execute_command(command)
-            return output
+            return self.execute_timed(command_type, command)
         except Exception as e:
             self.log(f"Erreur exécution WP-CLI: {e}", "ERROR")
             return None
 
+    def execute_timed(self, command_type, command):
+        """Exécute une commande sur la cible en mesurant sa latence (horloge monotone)
+
+        Chaque appel ajoute une entrée à self.command_timings : durée de
+        l'exécution distante (aller-retour complet), taille de la sortie
+        transférée et phase en cours.
+        """
+        timing = {
+            'type': command_type,
+            'key': command_key(command_type, command),
+            'phase': self.current_phase,
+            'started_at': time.monotonic() - self.start_monotonic
+        }
+        start = time.monotonic()
+        try:
+            output = self.ssh.execute_command(command)
+        except Exception as e:
+            timing['error'] = str(e)
+            raise
+        finally:
+            timing['exec_s'] = time.monotonic() - start
+            self.command_timings.append(timing)
+
+        timing['output_bytes'] = len(output.encode('utf-8')) if output else 0
+        timing['success'] = output is not None
+        return output
+
+    def measure_baseline(self, samples=3):
+        """Latences de référence pour décomposer la durée d'une commande
+
+        - network : commande shell vide (aller-retour réseau / SSH)
+        - wp_bootstrap : `wp eval` vide (réseau + chargement de WordPress)
+        """
+        probes = {
+            'network': ('ssh', 'true'),
+            'wp_bootstrap': ('wp-cli', "eval 'echo 1;'")
+        }
+        try:
+            for name, (command_type, command) in probes.items():
+                for _ in range(samples):
+                    if command_type == 'ssh':
+                        self.execute_timed(f'baseline:{name}', command)
+                    else:
+                        self.execute_wp_command(command, f'baseline:{name}')
+        finally:
+            # Les sondes ne font pas partie des commandes du test
+            probes_done = [t for t in self.command_timings if t['type'].startswith('baseline:')]
+            self.command_timings = [t for t in self.command_timings if not t['type'].startswith('baseline:')]
+
+        for name in probes:
+            durations = [t['exec_s'] for t in probes_done if t['type'] == f'baseline:{name}' and t.get('success')]
+            self.baseline_timings[name] = percentile(durations, 50)
+
+        if None not in self.baseline_timings.values():
+            self.log(f"Référence : réseau {self.baseline_timings['network'] * 1000:.0f} ms, "
+                     f"bootstrap WordPress {self.baseline_timings['wp_bootstrap'] * 1000:.0f} ms")
+
     def wait_for_user_action(self, phase_name, instructions, has_validation=True):
         """Interface utilisateur standardisée pour les phases"""
         print("\n" + "="*80)
@@ -238,14 +342,15 @@ class E2ETestFramework(ABC):
             
             self.log(f"  Exécution : {description}")
             
+            timings_before = len(self.command_timings)
             if cmd_type == 'wp-cli':
                 output = self.execute_wp_command(command)
             elif cmd_type == 'sql':
                 escaped_query = command.replace('"', '\\"')
                 wp_command = f'db query "{escaped_query}"'
-                output = self.execute_wp_command(wp_command)
+                output = self.execute_wp_command(wp_command, 'sql')
             elif cmd_type == 'ssh':
-                output = self.ssh.execute_command(command) if self.ssh else None
+                output = self.execute_timed('ssh', command) if self.ssh else None
             else:
                 output = None
                 self.log(f"Type de commande non supporté: {cmd_type}", "ERROR")
@@ -257,6 +362,10 @@ class E2ETestFramework(ABC):
                 'output': output,
                 'success': output is not None
             }
+            if len(self.command_timings) > timings_before:
+                timing = self.command_timings[-1]
+                timing['verification'] = verification_name
+                cmd_result['exec_s'] = timing['exec_s']
             
             # Vérification des résultats attendus
             if expected and output:
@@ -299,6 +408,8 @@ class E2ETestFramework(ABC):
         if total_verifications > 0:
             global_score = (success_verifications / total_verifications) * 100
 
+        timing_stats = self.write_timings(report_dir, report_path)
+
         # Contenu du rapport
         markdown_content = f"""# 📊 Rapport E2E - {self.test_name}
 
@@ -323,12 +434,15 @@ class E2ETestFramework(ABC):
             
             for cmd in verification['commands']:
                 cmd_status = "✅" if cmd['success'] else "❌"
-                markdown_content += f"- {cmd_status} **{cmd['description']}**\n"
+                duration = f" ({cmd['exec_s']:.2f}s)" if 'exec_s' in cmd else ""
+                markdown_content += f"- {cmd_status} **{cmd['description']}**{duration}\n"
                 if cmd['output']:
                     output_preview = cmd['output'][:200] + "..." if len(cmd['output']) > 200 else cmd['output']
                     markdown_content += f"  ```\n  {output_preview}\n  ```\n"
             markdown_content += "\n"
 
+        markdown_content += self.format_timings_markdown(timing_stats)
+
         # Observations utilisateur
         if self.report_data.get('user_observations'):
             markdown_content += "## 👁️ Observations Utilisateur\n\n"
@@ -377,6 +491,81 @@ _Rapport généré automatiquement par le framework E2E TB-Web_
             self.log(f"❌ Erreur génération rapport : {e}", "ERROR")
             return None
 
+    def write_timings(self, report_dir, report_path):
+        """Écrit les latences du run (JSON à côté du rapport) et les ajoute à l'historique
+
+        Retourne les statistiques par commande : valeur de ce run et
+        percentiles sur les TREND_RUNS derniers runs du même test.
+        """
+        run = {
+            'test_name': self.test_name,
+            'run_at': self.start_time.isoformat(),
+            'target': 'local' if self.site else 'ssh',
+            'total_s': time.monotonic() - self.start_monotonic,
+            'connect_s': self.connect_duration,
+            'baseline': self.baseline_timings,
+            'commands': self.command_timings
+        }
+
+        trend_path = os.path.join(report_dir, TIMINGS_TREND_FILE)
+        history = []
+        if os.path.exists(trend_path):
+            with open(trend_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        previous = json.loads(line)
+                    except ValueError:
+                        continue
+                    if previous.get('test_name') == self.test_name and previous.get('target') == run['target']:
+                        history.append(previous)
+        history = history[-(TREND_RUNS - 1):] + [run]
+
+        samples = {}
+        for past_run in history:
+            for timing in past_run.get('commands', []):
+                samples.setdefault(timing['key'], []).append(timing['exec_s'])
+
+        stats = {}
+        for timing in self.command_timings:
+            values = samples.get(timing['key'], [])
+            stats[timing['key']] = {
+                'type': timing['type'],
+                'exec_s': timing['exec_s'],
+                'output_bytes': timing.get('output_bytes', 0),
+                'samples': len(values),
+                **{f'p{q}': percentile(values, q) for q in (50, 90, 99)}
+            }
+        run['stats'] = stats
+
+        try:
+            with open(os.path.splitext(report_path)[0] + '.json', 'w', encoding='utf-8') as f:
+                json.dump(run, f, indent=2, ensure_ascii=False)
+            with open(trend_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({k: v for k, v in run.items() if k != 'stats'}, ensure_ascii=False) + '\n')
+        except OSError as e:
+            self.log(f"Erreur écriture des latences : {e}", "WARNING")
+
+        return stats
+
+    def format_timings_markdown(self, stats):
+        """Section Markdown des latences par commande"""
+        if not stats:
+            return ""
+
+        content = "## ⏱️ Latences des Commandes\n\n"
+        if self.connect_duration is not None:
+            content += f"- **Connexion** : {self.connect_duration:.2f}s\n"
+        if self.baseline_timings and None not in self.baseline_timings.values():
+            content += (f"- **Référence réseau** : {self.baseline_timings['network'] * 1000:.0f} ms • "
+                        f"**bootstrap WordPress** : {self.baseline_timings['wp_bootstrap'] * 1000:.0f} ms\n")
+        content += "\n| Commande | Ce run | p50 | p90 | p99 | Mesures | Sortie |\n"
+        content += "|----------|--------|-----|-----|-----|---------|--------|\n"
+        for key, data in sorted(stats.items(), key=lambda item: -item[1]['exec_s']):
+            label = key.replace('|', '\\|')
+            content += (f"| `{label}` | {data['exec_s']:.2f}s | {data['p50']:.2f}s | {data['p90']:.2f}s | "
+                        f"{data['p99']:.2f}s | {data['samples']} | {data['output_bytes']} o |\n")
+        return content + "\n"
+
     @abstractmethod
     def define_test_phases(self):
         """
@@ -393,12 +582,16 @@ _Rapport généré automatiquement par le framework E2E TB-Web_
         print("Plugin WC Qualiopi Steps - Framework E2E")
         print("="*80)
         
-        # Chargement config et connexion
-        if not self.load_config():
-            return False
+        # Chargement config et connexion (site local isolé ou serveur distant)
+        if self.fixture_pool:
+            if not self.connect_local_site():
+                return False
+        else:
+            if not self.load_config():
+                return False
 
-        if not self.connect_ssh():
-            return False
+            if not self.connect_ssh():
+                return False
 
         try:
             self.log(f"🚀 Démarrage du test E2E : {self.test_name}")
@@ -410,10 +603,16 @@ _Rapport généré automatiquement par le framework E2E TB-Web_
                 'framework_version': '1.0.0'
             }
 
+            try:
+                self.measure_baseline()
+            except Exception as e:
+                self.log(f"Mesure de référence impossible : {e}", "WARNING")
+
             # Exécution séquentielle des phases
             phases = self.define_test_phases()
 
             for phase_name, phase_func in phases:
+                self.current_phase = phase_name
                 try:
                     result = phase_func()
                     self.phases_completed.append(result)
@@ -468,8 +667,8 @@ class CartGuardWorkflowE2ETest(E2ETestFramework):
     Remplace les tests d'intégration complexes
     """
     
-    def __init__(self):
-        super().__init__("Cart Guard Workflow")
+    def __init__(self, fixture_pool=None):
+        super().__init__("Cart Guard Workflow", fixture_pool)
         self.test_product_id = 123
         
     def define_test_phases(self):
@@ -597,6 +796,12 @@ if __name__ == "__main__":
     print("🧪 Framework E2E - Test d'exemple Cart Guard")
     print("Basé sur le modèle PTI_001_2.py")
     
-    test = CartGuardWorkflowE2ETest()
+    # --local : site WordPress local cloné depuis le pool (aucun impact sur la production)
+    fixture_pool = None
+    if '--local' in sys.argv:
+        from fixture_pool import WordPressFixturePool
+        fixture_pool = WordPressFixturePool()
+    
+    test = CartGuardWorkflowE2ETest(fixture_pool)
     success = test.run_test()
     sys.exit(0 if success else 1)
@@ -45,16 +45,16 @@ describe('Token Session Integration', function () {
         // 2. Session avec TTL court aussi
         WCQS_Session::set_solved($product_id, 1); // 1 seconde
 
-        // 3. Attendre expiration
-        sleep(2);
+        // 3. Expiration (vieillissement de la session, sans attendre)
+        $this->ageSession(2);
 
-        // 4. Vérifications d'intégration
+        // 4. Token expiré
         expect(WCQS_Token::verify($token, $user_id, $product_id))->toBeFalse();
-        expect(WCQS_Session::is_solved($product_id))->toBeFalse();
 
-        // 5. Cleanup des sessions expirées
+        // 5. Cleanup des sessions expirées, avant is_solved() qui purge aussi la clé
         $cleaned = WCQS_Session::cleanup_expired();
-        expect($cleaned)->toBeGreaterThanOrEqual(1);
+        expect($cleaned)->toBe(1);
+        expect(WCQS_Session::is_solved($product_id))->toBeFalse();
     });
 
     it('supports token rotation with persistent sessions', function () {
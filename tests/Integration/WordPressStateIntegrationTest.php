@@ -0,0 +1,88 @@
+<?php
+
+use WcQualiopiSteps\Security\WCQS_Token;
+use WcQualiopiSteps\Tests\Support\WordPressStandIn;
+use WcQualiopiSteps\Utils\WCQS_Session;
+
+describe('WordPress State Integration', function () {
+
+    beforeEach(function () {
+        WCQS_Token::clear_cache();
+    });
+
+    it('persists solved status across requests after save_data', function () {
+        $this->actingAs(42);
+        WCQS_Session::set_solved(123, 3600);
+        WC()->session->save_data();
+
+        // Nouvelle requête du même client : session rechargée depuis le stockage
+        WC()->session = new MockWCSession();
+        expect(WCQS_Session::is_solved(123))->toBeTrue();
+
+        // Un autre client ne voit pas cette validation
+        $this->actingAs(43);
+        expect(WCQS_Session::is_solved(123))->toBeFalse();
+    });
+
+    it('loses unsaved session changes on the next request', function () {
+        $this->actingAs(42);
+        WCQS_Session::set_solved(123, 3600);
+
+        WC()->session = new MockWCSession();
+        expect(WCQS_Session::is_solved(123))->toBeFalse();
+    });
+
+    it('stores test validation in usermeta like the simulation handler', function () {
+        $this->actingAs(42);
+        update_user_meta(get_current_user_id(), '_wcqs_testpos_ok_123', current_time('c'));
+
+        $value = get_user_meta(42, '_wcqs_testpos_ok_123', true);
+        expect(strtotime($value))->toBeGreaterThan(time() - DAY_IN_SECONDS);
+        expect(get_user_meta(42, '_wcqs_testpos_ok_456', true))->toBe('');
+
+        expect(delete_user_meta(42, '_wcqs_testpos_ok_123'))->toBeTrue();
+        expect(get_user_meta(42, '_wcqs_testpos_ok_123'))->toBe([]);
+    });
+
+    it('expires transients after their TTL', function () {
+        set_transient('wcqs_validation_123', ['ok' => true], HOUR_IN_SECONDS);
+        expect(get_transient('wcqs_validation_123'))->toBe(['ok' => true]);
+
+        $this->travel(HOUR_IN_SECONDS + 1);
+        expect(get_transient('wcqs_validation_123'))->toBeFalse();
+        expect(WordPressStandIn::transients())->not()->toHaveKey('wcqs_validation_123');
+    });
+
+    it('keeps HMAC secret in options across token checks', function () {
+        $token = WCQS_Token::create(42, 123);
+
+        expect(get_option('wcqs_hmac_secret'))->not()->toBeFalse();
+        expect(WordPressStandIn::autoloaded_options())->not()->toHaveKey('wcqs_hmac_secret');
+
+        // Cache vidé : la clé est relue depuis les options
+        WCQS_Token::clear_cache();
+        expect(WCQS_Token::verify($token, 42, 123))->toBeArray();
+    });
+
+    it('restores a snapshot taken mid-test', function () {
+        $this->setOption('wcqs_flags', ['enforce_cart' => true]);
+        $snapshot = WordPressStandIn::snapshot();
+
+        update_option('wcqs_flags', ['enforce_cart' => false]);
+        set_transient('wcqs_validation_123', 1);
+        update_user_meta(42, '_wcqs_testpos_ok_123', current_time('c'));
+
+        WordPressStandIn::restore($snapshot);
+
+        expect(get_option('wcqs_flags'))->toBe(['enforce_cart' => true]);
+        expect(get_transient('wcqs_validation_123'))->toBeFalse();
+        expect(get_user_meta(42, '_wcqs_testpos_ok_123', true))->toBe('');
+    });
+
+    it('starts every test from a clean state', function () {
+        expect(get_option('wcqs_flags'))->toBeFalse();
+        expect(get_current_user_id())->toBe(0);
+        expect(WordPressStandIn::transients())->toBe([]);
+    });
+
+});
@@ -44,40 +44,7 @@ expect()->extend('toBeValidDecision', function () {
 |
 */
 
-/**
- * Créer un contexte de test pour CheckoutDecision
- */
-function testContext(array $overrides = []): array
-{
-    $defaults = [
-        'flags' => [
-            'enforce_checkout' => false,
-            'logging' => true
-        ],
-        'cart' => [
-            'product_id' => 123
-        ],
-        'user' => [
-            'id' => 42
-        ],
-        'query' => [
-            'tp_token' => null
-        ],
-        'session' => [
-            'solved' => [123 => false]
-        ],
-        'usermeta' => [
-            'ok' => [123 => false]
-        ],
-        'mapping' => [
-            'active' => true,
-            'test_page_url' => '/test-123'
-        ]
-    ];
-
-    // Utiliser array_replace_recursive pour éviter les problèmes avec les valeurs null
-    return array_replace_recursive($defaults, $overrides);
-}
+// testContext() est défini dans tests/bootstrap.php (une seule déclaration)
 
 /**
  * Simuler un timestamp fixe pour les tests
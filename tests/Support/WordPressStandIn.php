@@ -0,0 +1,306 @@
+<?php
+
+namespace WcQualiopiSteps\Tests\Support;
+
+/**
+ * Substitut en mémoire de l'état WordPress/WooCommerce pour les tests
+ *
+ * Options (avec autoload), transients avec TTL, usermeta, utilisateur courant
+ * et stockage des sessions WooCommerce par client. Les fonctions WordPress de
+ * tests/bootstrap.php délèguent à cette classe.
+ *
+ * snapshot()/restore() copient de simples tableaux PHP : grâce à la copie à
+ * l'écriture, un snapshot ne coûte rien tant que l'état n'est pas modifié.
+ * Les objets stockés en valeur sont partagés, pas clonés.
+ *
+ * L'horloge (now/travel) ne pilote que les transients : le code du plugin
+ * qui lit time() directement n'est pas affecté.
+ */
+final class WordPressStandIn
+{
+    /** @var array<string, bool> */
+    private static $autoload = array();
+
+    /** @var array<string, array{value: mixed, expires: int}> */
+    private static $transients = array();
+
+    /** @var array<int, array<string, array<int, mixed>>> */
+    private static $usermeta = array();
+
+    /** @var array<string, array> Sessions WooCommerce persistées par save_data() */
+    private static $sessions = array();
+
+    /** @var int */
+    private static $current_user_id = 0;
+
+    /** @var int Décalage de l'horloge en secondes */
+    private static $clock_offset = 0;
+
+    /**
+     * Remet tout l'état à zéro
+     */
+    public static function reset(): void
+    {
+        $GLOBALS['test_options'] = array();
+        self::$autoload = array();
+        self::$transients = array();
+        self::$usermeta = array();
+        self::$sessions = array();
+        self::$current_user_id = 0;
+        self::$clock_offset = 0;
+    }
+
+    /**
+     * Capture l'état courant (copie à l'écriture, coût constant)
+     */
+    public static function snapshot(): array
+    {
+        return array(
+            'options'         => $GLOBALS['test_options'] ?? array(),
+            'autoload'        => self::$autoload,
+            'transients'      => self::$transients,
+            'usermeta'        => self::$usermeta,
+            'sessions'        => self::$sessions,
+            'current_user_id' => self::$current_user_id,
+            'clock_offset'    => self::$clock_offset,
+        );
+    }
+
+    /**
+     * Restaure un état capturé par snapshot()
+     */
+    public static function restore( array $snapshot ): void
+    {
+        $GLOBALS['test_options'] = $snapshot['options'];
+        self::$autoload = $snapshot['autoload'];
+        self::$transients = $snapshot['transients'];
+        self::$usermeta = $snapshot['usermeta'];
+        self::$sessions = $snapshot['sessions'];
+        self::$current_user_id = $snapshot['current_user_id'];
+        self::$clock_offset = $snapshot['clock_offset'];
+    }
+
+    /**
+     * Horloge du substitut (time() + décalage)
+     */
+    public static function now(): int
+    {
+        return time() + self::$clock_offset;
+    }
+
+    /**
+     * Avance l'horloge sans attendre
+     */
+    public static function travel( int $seconds ): void
+    {
+        self::$clock_offset += $seconds;
+    }
+
+    // === Options ===
+
+    public static function get_option( string $option, $default = false )
+    {
+        return array_key_exists( $option, $GLOBALS['test_options'] ?? array() )
+            ? $GLOBALS['test_options'][ $option ]
+            : $default;
+    }
+
+    /**
+     * Comme WordPress : false si la valeur est inchangée
+     */
+    public static function update_option( string $option, $value, $autoload = null ): bool
+    {
+        $exists = array_key_exists( $option, $GLOBALS['test_options'] ?? array() );
+        if ( $exists && $GLOBALS['test_options'][ $option ] === $value ) {
+            return false;
+        }
+
+        $GLOBALS['test_options'][ $option ] = $value;
+        if ( null !== $autoload ) {
+            self::$autoload[ $option ] = in_array( $autoload, array( true, 'yes', 'on', 'auto', 'auto-on' ), true );
+        } elseif ( ! $exists ) {
+            self::$autoload[ $option ] = true;
+        }
+        return true;
+    }
+
+    public static function delete_option( string $option ): bool
+    {
+        if ( ! array_key_exists( $option, $GLOBALS['test_options'] ?? array() ) ) {
+            return false;
+        }
+
+        unset( $GLOBALS['test_options'][ $option ], self::$autoload[ $option ] );
+        return true;
+    }
+
+    /**
+     * Options chargées à chaque requête (autoload)
+     */
+    public static function autoloaded_options(): array
+    {
+        return array_intersect_key(
+            $GLOBALS['test_options'] ?? array(),
+            array_filter( self::$autoload )
+        );
+    }
+
+    // === Transients ===
+
+    /**
+     * Comme WordPress : un transient expiré est supprimé à la lecture
+     */
+    public static function get_transient( string $transient )
+    {
+        if ( ! isset( self::$transients[ $transient ] ) ) {
+            return false;
+        }
+
+        $expires = self::$transients[ $transient ]['expires'];
+        if ( $expires > 0 && $expires < self::now() ) {
+            unset( self::$transients[ $transient ] );
+            return false;
+        }
+        return self::$transients[ $transient ]['value'];
+    }
+
+    /**
+     * @param int $expiration TTL en secondes (0 : pas d'expiration)
+     */
+    public static function set_transient( string $transient, $value, int $expiration = 0 ): bool
+    {
+        self::$transients[ $transient ] = array(
+            'value'   => $value,
+            'expires' => $expiration > 0 ? self::now() + $expiration : 0,
+        );
+        return true;
+    }
+
+    public static function delete_transient( string $transient ): bool
+    {
+        if ( ! isset( self::$transients[ $transient ] ) ) {
+            return false;
+        }
+
+        unset( self::$transients[ $transient ] );
+        return true;
+    }
+
+    /**
+     * Transients présents en mémoire, expirés compris (non encore purgés)
+     */
+    public static function transients(): array
+    {
+        return self::$transients;
+    }
+
+    // === Usermeta ===
+
+    /**
+     * Sémantique WordPress : clé vide = toutes les metas, $single = première valeur ou ''
+     */
+    public static function get_user_meta( int $user_id, string $key = '', bool $single = false )
+    {
+        $meta = self::$usermeta[ $user_id ] ?? array();
+
+        if ( '' === $key ) {
+            return $meta;
+        }
+        if ( ! isset( $meta[ $key ] ) ) {
+            return $single ? '' : array();
+        }
+        return $single ? $meta[ $key ][0] : $meta[ $key ];
+    }
+
+    public static function add_user_meta( int $user_id, string $key, $value, bool $unique = false ): bool
+    {
+        if ( $unique && isset( self::$usermeta[ $user_id ][ $key ] ) ) {
+            return false;
+        }
+
+        self::$usermeta[ $user_id ][ $key ][] = $value;
+        return true;
+    }
+
+    /**
+     * Remplace toutes les valeurs de la clé ; false si la valeur est inchangée
+     */
+    public static function update_user_meta( int $user_id, string $key, $value ): bool
+    {
+        if ( ( self::$usermeta[ $user_id ][ $key ] ?? null ) === array( $value ) ) {
+            return false;
+        }
+
+        self::$usermeta[ $user_id ][ $key ] = array( $value );
+        return true;
+    }
+
+    /**
+     * Supprime la clé, ou seulement les entrées égales à $value si fournie
+     */
+    public static function delete_user_meta( int $user_id, string $key, $value = '' ): bool
+    {
+        if ( ! isset( self::$usermeta[ $user_id ][ $key ] ) ) {
+            return false;
+        }
+
+        if ( '' === $value ) {
+            unset( self::$usermeta[ $user_id ][ $key ] );
+            return true;
+        }
+
+        $kept = array_values( array_filter(
+            self::$usermeta[ $user_id ][ $key ],
+            function ( $existing ) use ( $value ) {
+                return $existing != $value;
+            }
+        ) );
+        if ( count( $kept ) === count( self::$usermeta[ $user_id ][ $key ] ) ) {
+            return false;
+        }
+
+        if ( $kept ) {
+            self::$usermeta[ $user_id ][ $key ] = $kept;
+        } else {
+            unset( self::$usermeta[ $user_id ][ $key ] );
+        }
+        return true;
+    }
+
+    // === Utilisateur courant ===
+
+    public static function get_current_user_id(): int
+    {
+        return self::$current_user_id;
+    }
+
+    public static function set_current_user( int $user_id ): void
+    {
+        self::$current_user_id = $user_id;
+    }
+
+    // === Sessions WooCommerce ===
+
+    /**
+     * Identifiant client comme WC_Session_Handler : ID utilisateur, sinon invité
+     */
+    public static function customer_id(): string
+    {
+        return self::$current_user_id > 0 ? (string) self::$current_user_id : 'guest';
+    }
+
+    public static function load_session( string $customer_id ): array
+    {
+        return self::$sessions[ $customer_id ] ?? array();
+    }
+
+    public static function save_session( string $customer_id, array $data ): void
+    {
+        self::$sessions[ $customer_id ] = $data;
+    }
+
+    public static function destroy_session( string $customer_id ): void
+    {
+        unset( self::$sessions[ $customer_id ] );
+    }
+}
@@ -3,16 +3,25 @@
 namespace WcQualiopiSteps\Tests;
 
 use PHPUnit\Framework\TestCase as BaseTestCase;
+use WcQualiopiSteps\Tests\Support\WordPressStandIn;
 
 abstract class TestCase extends BaseTestCase
 {
+    /**
+     * État WordPress de référence, capturé une fois puis restauré autour de chaque test
+     */
+    private static $baseline = null;
+
     protected function setUp(): void
     {
         parent::setUp();
         
-        // Nettoyer les options de test avant chaque test
-        global $test_options;
-        $test_options = array();
+        // Repartir de l'état de référence (options, transients, usermeta, sessions)
+        if (self::$baseline === null) {
+            WordPressStandIn::reset();
+            self::$baseline = WordPressStandIn::snapshot();
+        }
+        WordPressStandIn::restore(self::$baseline);
         
         // Nettoyer le cache des sessions WC mock
         if (function_exists('WC') && WC()->session) {
@@ -25,8 +34,58 @@ abstract class TestCase extends BaseTestCase
         parent::tearDown();
         
         // Nettoyer après chaque test
-        global $test_options;
-        $test_options = array();
+        WordPressStandIn::restore(self::$baseline);
+    }
+
+    /**
+     * Définit une option WordPress pour le test
+     */
+    protected function setOption(string $option, $value, $autoload = null): void
+    {
+        WordPressStandIn::update_option($option, $value, $autoload);
+    }
+
+    /**
+     * Connecte un utilisateur et recharge la session WC de ce client
+     */
+    protected function actingAs(int $user_id): void
+    {
+        if (function_exists('WC') && WC()->session) {
+            WC()->session->save_data();
+        }
+        
+        WordPressStandIn::set_current_user($user_id);
+        WC()->session = new \MockWCSession();
+    }
+
+    /**
+     * Avance l'horloge des transients sans attendre
+     */
+    protected function travel(int $seconds): void
+    {
+        WordPressStandIn::travel($seconds);
+    }
+
+    /**
+     * Vieillit les entrées WCQS_Session de la session courante (équivaut à sleep($seconds))
+     *
+     * WCQS_Session compare des horodatages absolus à time() : reculer
+     * 'timestamp' et 'expires' simule l'écoulement du temps.
+     */
+    protected function ageSession(int $seconds): void
+    {
+        foreach (WC()->session->get_session_data() as $key => $value) {
+            if (strpos($key, 'wcqs_') !== 0 || !is_array($value)) {
+                continue;
+            }
+            
+            foreach (['timestamp', 'expires'] as $field) {
+                if (isset($value[$field])) {
+                    $value[$field] -= $seconds;
+                }
+            }
+            WC()->session->set($key, $value);
+        }
     }
 
     /**
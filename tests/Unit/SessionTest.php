@@ -44,8 +44,8 @@ describe('WCQS_Session', function () {
         WCQS_Session::set_solved($product_id, $short_ttl);
         expect(WCQS_Session::is_solved($product_id))->toBeTrue();
 
-        // Attendre expiration
-        sleep(2);
+        // Expiration (vieillissement de la session, sans attendre)
+        $this->ageSession(2);
 
         // Doit être expiré maintenant
         expect(WCQS_Session::is_solved($product_id))->toBeFalse();
@@ -98,12 +98,12 @@ describe('WCQS_Session', function () {
         WCQS_Session::set_solved(202, 1);    // Expire rapidement
         WCQS_Session::set_solved(203, 3600); // Valide
 
-        // Attendre expiration
-        sleep(2);
+        // Expiration (vieillissement de la session, sans attendre)
+        $this->ageSession(2);
 
         // Nettoyer
         $cleaned = WCQS_Session::cleanup_expired();
-        expect($cleaned)->toBeGreaterThanOrEqual(1);
+        expect($cleaned)->toBe(1); // Seule 202 a expiré
 
         // Vérifier état
         expect(WCQS_Session::is_solved(201))->toBeTrue();
@@ -129,7 +129,7 @@ describe('WCQS_Session', function () {
             ->toHaveKey(303);
 
         // Attendre expiration d'une session
-        sleep(2);
+        $this->ageSession(2);
 
         $active_sessions = WCQS_Session::get_all_active_sessions();
         
@@ -174,7 +174,7 @@ describe('WCQS_Session', function () {
         WCQS_Session::set_solved(502, 3600); // Active
         WCQS_Session::set_solved(503, 1);    // Expire rapidement
 
-        sleep(2); // Laisser 503 expirer
+        $this->ageSession(2); // Laisser 503 expirer
 
         $stats = WCQS_Session::get_session_stats();
         
@@ -10,26 +10,58 @@ if (!defined('ABSPATH')) {
 
 // Charger Composer
 require_once __DIR__ . '/../vendor/autoload.php';
+require_once __DIR__ . '/Support/WordPressStandIn.php';
 
-// Simuler les fonctions WordPress essentielles pour les tests unitaires
+use WcQualiopiSteps\Tests\Support\WordPressStandIn;
+
+if ( ! defined( 'HOUR_IN_SECONDS' ) ) {
+    define( 'MINUTE_IN_SECONDS', 60 );
+    define( 'HOUR_IN_SECONDS', 60 * MINUTE_IN_SECONDS );
+    define( 'DAY_IN_SECONDS', 24 * HOUR_IN_SECONDS );
+}
+
+// Simuler les fonctions WordPress essentielles, adossées au substitut en mémoire
 if ( ! function_exists( 'get_option' ) ) {
     $test_options = array();
     
     function get_option( $option, $default = false ) {
-        global $test_options;
-        return isset( $test_options[ $option ] ) ? $test_options[ $option ] : $default;
+        return WordPressStandIn::get_option( $option, $default );
     }
     
     function update_option( $option, $value, $autoload = null ) {
-        global $test_options;
-        $test_options[ $option ] = $value;
-        return true;
+        return WordPressStandIn::update_option( $option, $value, $autoload );
     }
     
     function delete_option( $option ) {
-        global $test_options;
-        unset( $test_options[ $option ] );
-        return true;
+        return WordPressStandIn::delete_option( $option );
+    }
+    
+    function get_transient( $transient ) {
+        return WordPressStandIn::get_transient( $transient );
+    }
+    
+    function set_transient( $transient, $value, $expiration = 0 ) {
+        return WordPressStandIn::set_transient( $transient, $value, (int) $expiration );
+    }
+    
+    function delete_transient( $transient ) {
+        return WordPressStandIn::delete_transient( $transient );
+    }
+    
+    function get_user_meta( $user_id, $key = '', $single = false ) {
+        return WordPressStandIn::get_user_meta( (int) $user_id, $key, $single );
+    }
+    
+    function add_user_meta( $user_id, $meta_key, $meta_value, $unique = false ) {
+        return WordPressStandIn::add_user_meta( (int) $user_id, $meta_key, $meta_value, $unique );
+    }
+    
+    function update_user_meta( $user_id, $meta_key, $meta_value ) {
+        return WordPressStandIn::update_user_meta( (int) $user_id, $meta_key, $meta_value );
+    }
+    
+    function delete_user_meta( $user_id, $meta_key, $meta_value = '' ) {
+        return WordPressStandIn::delete_user_meta( (int) $user_id, $meta_key, $meta_value );
     }
     
     function wp_generate_password( $length = 12, $special_chars = true, $extra_special_chars = false ) {
@@ -114,7 +146,7 @@ if ( ! function_exists( 'get_option' ) ) {
     }
     
     function get_current_user_id() {
-        return 0;
+        return WordPressStandIn::get_current_user_id();
     }
     
     function get_bloginfo( $show = '', $filter = 'raw' ) {
@@ -244,10 +276,18 @@ if ( ! function_exists( 'get_option' ) ) {
 // Mock WooCommerce pour les tests de session si nécessaire
 if ( ! function_exists( 'WC' ) ) {
     class MockWCSession {
-        private $data = array();
+        private $customer_id;
+        private $data;
+        private $dirty = false;
+        
+        public function __construct( $customer_id = null ) {
+            $this->customer_id = $customer_id ?? WordPressStandIn::customer_id();
+            $this->data = WordPressStandIn::load_session( $this->customer_id );
+        }
         
         public function set( $key, $value ) {
             $this->data[ $key ] = $value;
+            $this->dirty = true;
         }
         
         public function get( $key, $default = null ) {
@@ -256,11 +296,24 @@ if ( ! function_exists( 'WC' ) ) {
         
         public function __unset( $key ) {
             unset( $this->data[ $key ] );
+            $this->dirty = true;
         }
         
         public function get_session_data() {
             return $this->data;
         }
+        
+        public function get_customer_id() {
+            return $this->customer_id;
+        }
+        
+        // Comme WC_Session_Handler : ne persiste que si la session a changé
+        public function save_data() {
+            if ( $this->dirty ) {
+                WordPressStandIn::save_session( $this->customer_id, $this->data );
+                $this->dirty = false;
+            }
+        }
     }
     
     class MockWC {
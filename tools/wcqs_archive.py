@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Archives compressées WCQS par gabarits de messages (.wcqsz)
+
+WCQS_Logger::rotate_if_needed archive le log en un seul flux gzip : pour lire
+une heure, il faut tout décompresser. Ici chaque ligne est décomposée en
+en-tête (horodatage, niveau, utilisateur, URI) et en gabarit de message, dont
+les parties variables (tout mot contenant un chiffre) sont extraites comme
+paramètres. Les lignes sont regroupées en blocs d'une heure au plus, stockés
+par colonnes et compressés indépendamment (lzma), avec un index de blocs en
+fin de fichier. Le format est sans perte : toute ligne qui ne se reconstruit
+pas à l'identique est stockée brute.
+
+Usage :
+    python tools/wcqs_archive.py pack wcqs-2025-09-26.log.1758900000.gz -o wcqs-2025-09-26.wcqsz
+    python tools/wcqs_archive.py convert /chemin/uploads/wcqs-logs [--delete-gz]
+    python tools/wcqs_archive.py cat wcqs-2025-09-26.wcqsz --hour 2025-09-26T14
+    python tools/wcqs_archive.py info wcqs-2025-09-26.wcqsz
+"""
+
+import argparse
+import calendar
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import re
+import struct
+import sys
+import time
+from pathlib import Path
+
+from wcqs_logs import LOG_FILE_PATTERN, log_sort_key
+
+MAGIC = b'WCQSZ1\n'
+TRAILER = struct.Struct('<Q8s')
+TRAILER_MAGIC = b'WCQSZEND'
+
+# Lignes par bloc au plus (un bloc ne couvre jamais plus d'une heure)
+BLOCK_LINES = 50000
+
+# En-tête produit par WCQS_Logger::log_raw : [%s] %s [USER:%d] [%s] %s
+HEADER_PATTERN = re.compile(r'^\[(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)([^\]]*)\] (\S+) +\[USER:(\d+)\] \[([^\]]*)\] (.*)$')
+
+# Partie variable d'un message : tout mot contenant au moins un chiffre
+VARIABLE_PATTERN = re.compile(r'[\w\-.]*\d[\w\-.]*')
+
+COLUMNS = ('kind', 'ts', 'tz', 'level', 'user', 'uri', 'template', 'params', 'raw')
+
+RAW, STRUCTURED = '0', '1'
+
+
+def format_header(ts, tz, level, user_id, uri):
+    return f'[{ts}{tz}] {level:<7} [USER:{user_id}] [{uri}] '
+
+
+def _epoch(ts):
+    return calendar.timegm(time.strptime(ts, '%Y-%m-%dT%H:%M:%S'))
+
+
+def _iso(epoch):
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(epoch))
+
+
+class Interner:
+    """Table de chaînes globale à l'archive (index stable)"""
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.index = {value: i for i, value in enumerate(self.values)}
+
+    def get(self, value):
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.values)
+            self.values.append(value)
+        return position
+
+
+class BlockBuilder:
+    """Accumule les colonnes d'un bloc"""
+
+    def __init__(self, hour):
+        self.hour = hour
+        self.columns = {name: [] for name in COLUMNS}
+        self.lines = 0
+        self.first_epoch = None
+        self.last_epoch = None
+        self.previous_epoch = 0
+
+    def add_raw(self, line):
+        self.columns['kind'].append(RAW)
+        self.columns['raw'].append(line)
+        self.lines += 1
+
+    def add(self, epoch, tz_id, level_id, user_id, uri_id, template_id, params):
+        columns = self.columns
+        columns['kind'].append(STRUCTURED)
+        columns['ts'].append(str(epoch - self.previous_epoch))
+        columns['tz'].append(str(tz_id))
+        columns['level'].append(str(level_id))
+        columns['user'].append(user_id)
+        columns['uri'].append(str(uri_id))
+        columns['template'].append(str(template_id))
+        columns['params'].append('\x00'.join(params))
+        self.previous_epoch = epoch
+        if self.first_epoch is None:
+            self.first_epoch = epoch
+        self.last_epoch = epoch
+        self.lines += 1
+
+    def encode(self):
+        """Colonnes sérialisées (longueurs + données) puis compressées
+
+        Retourne (données, taille du dictionnaire LZMA2 nécessaire au décodage).
+        """
+        parts = ['\n'.join(self.columns[name]).encode('utf-8', 'surrogateescape') for name in COLUMNS]
+        header = struct.pack(f'<{len(parts)}I', *(len(part) for part in parts))
+        payload = header + b''.join(parts)
+        dict_size = _dict_size(len(payload))
+        return lzma.compress(payload, format=lzma.FORMAT_RAW, filters=_filters(dict_size)), dict_size
+
+
+def _dict_size(size):
+    """Dictionnaire ajusté au bloc : un bloc d'une heure calme ne paie pas 64 Mo d'initialisation"""
+    return min(1 << 26, max(1 << 16, 1 << (size - 1).bit_length()))
+
+
+def _filters(dict_size):
+    return [{'id': lzma.FILTER_LZMA2, 'preset': 9 | lzma.PRESET_EXTREME, 'dict_size': dict_size}]
+
+
+def decode_block(data, dict_size):
+    payload = lzma.decompress(data, format=lzma.FORMAT_RAW, filters=_filters(dict_size))
+    size = struct.calcsize(f'<{len(COLUMNS)}I')
+    lengths = struct.unpack(f'<{len(COLUMNS)}I', payload[:size])
+    columns = {}
+    position = size
+    for name, length in zip(COLUMNS, lengths):
+        text = payload[position:position + length].decode('utf-8', 'surrogateescape')
+        columns[name] = text.split('\n')
+        position += length
+    return columns
+
+
+class ArchiveWriter:
+    """Écriture en flux : un bloc est compressé dès qu'il est complet"""
+
+    def __init__(self, path, block_lines=BLOCK_LINES):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(self.path.name + '.tmp')
+        self.handle = open(self.tmp_path, 'wb')
+        self.handle.write(MAGIC)
+        self.block_lines = block_lines
+        self.templates = Interner()
+        self.uris = Interner()
+        self.timezones = Interner()
+        self.levels = Interner()
+        self.blocks = []
+        self.block = None
+        self.hour = None
+        self.digest = hashlib.sha256()
+        self.original_bytes = 0
+        self.trailing_newline = True
+
+    def _flush(self):
+        if self.block is None or not self.block.lines:
+            return
+        data, dict_size = self.block.encode()
+        self.blocks.append({
+            'offset': self.handle.tell(),
+            'length': len(data),
+            'dict_size': dict_size,
+            'lines': self.block.lines,
+            'hour': self.block.hour,
+            'first': self.block.first_epoch,
+            'last': self.block.last_epoch
+        })
+        self.handle.write(data)
+        self.block = None
+
+    def _block_for(self, hour):
+        if hour is not None and hour != self.hour:
+            self._flush()
+            self.hour = hour
+        if self.block is not None and self.block.lines >= self.block_lines:
+            self._flush()
+        if self.block is None:
+            self.block = BlockBuilder(self.hour)
+        return self.block
+
+    def add_line(self, line):
+        """Ajoute une ligne (sans fin de ligne)"""
+        match = HEADER_PATTERN.match(line) if '\x00' not in line else None
+        if match:
+            ts, tz, level, user_id, uri, message = match.groups()
+            try:
+                epoch = _epoch(ts)
+            except ValueError:
+                match = None
+
+        if match and format_header(ts, tz, level, user_id, uri) + message == line:
+            literals = VARIABLE_PATTERN.split(message)
+            params = VARIABLE_PATTERN.findall(message)
+            block = self._block_for(ts[:13])
+            block.add(
+                epoch,
+                self.timezones.get(tz),
+                self.levels.get(level),
+                user_id,
+                self.uris.get(uri),
+                self.templates.get('\x00'.join(literals)),
+                params
+            )
+        else:
+            self._block_for(None).add_raw(line)
+
+    def add_stream(self, handle):
+        """Lit un flux binaire ligne à ligne (mémoire bornée par un bloc)"""
+        data = b''
+        for data in handle:
+            self.digest.update(data)
+            self.original_bytes += len(data)
+            self.add_line(data.rstrip(b'\n').decode('utf-8', 'surrogateescape'))
+        self.trailing_newline = data.endswith(b'\n') or not data
+
+    def close(self, source=None):
+        self._flush()
+        footer = lzma.compress(json.dumps({
+            'version': 1,
+            'source': source,
+            'sha256': self.digest.hexdigest(),
+            'original_bytes': self.original_bytes,
+            'trailing_newline': self.trailing_newline,
+            'templates': self.templates.values,
+            'uris': self.uris.values,
+            'timezones': self.timezones.values,
+            'levels': self.levels.values,
+            'blocks': self.blocks
+        }).encode('utf-8'))
+        offset = self.handle.tell()
+        self.handle.write(footer)
+        self.handle.write(TRAILER.pack(offset, TRAILER_MAGIC))
+        self.handle.close()
+        self.tmp_path.replace(self.path)
+
+
+class ArchiveReader:
+    """Accès aléatoire : seul l'index est lu à l'ouverture"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as handle:
+            if handle.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} n'est pas une archive .wcqsz")
+            handle.seek(-TRAILER.size, io.SEEK_END)
+            footer_offset, magic = TRAILER.unpack(handle.read(TRAILER.size))
+            if magic != TRAILER_MAGIC:
+                raise ValueError(f"{path} : archive tronquée")
+            handle.seek(footer_offset)
+            footer_size = self.path.stat().st_size - TRAILER.size - footer_offset
+            self.footer = json.loads(lzma.decompress(handle.read(footer_size)))
+        self.templates = [template.split('\x00') for template in self.footer['templates']]
+
+    @property
+    def blocks(self):
+        return self.footer['blocks']
+
+    def hours(self):
+        return sorted({block['hour'] for block in self.blocks if block['hour']})
+
+    def read_block(self, block):
+        with open(self.path, 'rb') as handle:
+            handle.seek(block['offset'])
+            columns = decode_block(handle.read(block['length']), block['dict_size'])
+
+        footer = self.footer
+        uris, timezones, levels = footer['uris'], footer['timezones'], footer['levels']
+        raw = iter(columns['raw'])
+        structured = zip(columns['ts'], columns['tz'], columns['level'], columns['user'],
+                         columns['uri'], columns['template'], columns['params'])
+        epoch = 0
+        for kind in columns['kind']:
+            if kind == RAW:
+                yield next(raw)
+                continue
+
+            delta, tz, level, user_id, uri, template, params = next(structured)
+            epoch += int(delta)
+            literals = self.templates[int(template)]
+            values = params.split('\x00') if len(literals) > 1 else []
+            message = literals[0] + ''.join(value + literal for value, literal in zip(values, literals[1:]))
+            yield format_header(_iso(epoch), timezones[int(tz)], levels[int(level)], user_id, uris[int(uri)]) + message
+
+    def lines(self, hours=None):
+        """Lignes des blocs demandés (toutes si hours est None), dans l'ordre"""
+        for block in self.blocks:
+            if hours is None or block['hour'] in hours:
+                yield from self.read_block(block)
+
+    def write_original(self, out):
+        """Restitue le fichier d'origine à l'octet près"""
+        first = True
+        for line in self.lines():
+            if not first:
+                out.write(b'\n')
+            out.write(line.encode('utf-8', 'surrogateescape'))
+            first = False
+        if self.footer['trailing_newline'] and not first:
+            out.write(b'\n')
+
+
+class _HashWriter:
+    def __init__(self):
+        self.digest = hashlib.sha256()
+
+    def write(self, data):
+        self.digest.update(data)
+
+
+def verify(path):
+    """Vérifie que l'archive restitue exactement le contenu d'origine"""
+    reader = ArchiveReader(path)
+    writer = _HashWriter()
+    reader.write_original(writer)
+    return writer.digest.hexdigest() == reader.footer['sha256']
+
+
+def _open_binary(path):
+    path = Path(path)
+    return gzip.open(path, 'rb') if path.suffix == '.gz' else open(path, 'rb')
+
+
+def pack(inputs, output, block_lines=BLOCK_LINES):
+    writer = ArchiveWriter(output, block_lines)
+    for path in inputs:
+        with _open_binary(path) as handle:
+            writer.add_stream(handle)
+    writer.close(source=', '.join(Path(p).name for p in inputs))
+    return writer
+
+
+def convert_directory(directory, delete_gz=False, block_lines=BLOCK_LINES):
+    """Convertit les archives wcqs-*.log.<ts>.gz d'un dossier, vérification comprise
+
+    Un .wcqsz qui n'est pas plus petit que son .gz (petits fichiers, messages
+    peu répétitifs) est supprimé et le .gz conservé, même avec delete_gz.
+    Retourne [(archive, cible, taille .gz, taille .wcqsz, cible conservée)].
+    """
+    archives = sorted(
+        (p for p in Path(directory).iterdir() if LOG_FILE_PATTERN.match(p.name) and p.name.endswith('.gz')),
+        key=log_sort_key
+    )
+    results = []
+    for archive in archives:
+        target = archive.with_name(archive.name[:-len('.gz')] + '.wcqsz')
+        if target.exists():
+            continue
+        pack([archive], target, block_lines)
+        if not verify(target):
+            target.unlink()
+            raise RuntimeError(f"Vérification échouée pour {archive.name}")
+        gz_size, size = archive.stat().st_size, target.stat().st_size
+        kept = size < gz_size
+        results.append((archive, target, gz_size, size, kept))
+        if not kept:
+            target.unlink()
+        elif delete_gz:
+            archive.unlink()
+    return results
+
+
+def _format_size(size):
+    for unit in ('o', 'Ko', 'Mo', 'Go'):
+        if size < 1024 or unit == 'Go':
+            return f'{size:.0f} {unit}' if unit == 'o' else f'{size:.1f} {unit}'
+        size /= 1024
+
+
+def display_info(path):
+    reader = ArchiveReader(path)
+    footer = reader.footer
+    size = reader.path.stat().st_size
+    lines = sum(block['lines'] for block in reader.blocks)
+
+    print("\n" + "=" * 60)
+    print(f"🗜️  {reader.path.name}")
+    print("=" * 60)
+    print(f"Source        : {footer['source']}")
+    print(f"Lignes        : {lines:,}")
+    print(f"Taille        : {_format_size(size)} (original {_format_size(footer['original_bytes'])}, "
+          f"ratio {footer['original_bytes'] / max(size, 1):.1f}×)")
+    print(f"Gabarits      : {len(footer['templates']):,} • URIs : {len(footer['uris']):,}")
+    print(f"Blocs         : {len(reader.blocks)} • heures : {', '.join(reader.hours()) or '-'}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archives compressées WCQS par gabarits")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pack_parser = subparsers.add_parser('pack', help="Créer une archive à partir de logs (.log ou .gz)")
+    pack_parser.add_argument('inputs', nargs='+')
+    pack_parser.add_argument('-o', '--output', required=True)
+    pack_parser.add_argument('--block-lines', type=int, default=BLOCK_LINES)
+
+    convert_parser = subparsers.add_parser('convert', help="Convertir les archives .gz d'un dossier wcqs-logs")
+    convert_parser.add_argument('directory')
+    convert_parser.add_argument('--delete-gz', action='store_true', help="Supprimer les .gz après vérification")
+    convert_parser.add_argument('--block-lines', type=int, default=BLOCK_LINES)
+
+    cat_parser = subparsers.add_parser('cat', help="Afficher des lignes (toutes ou certaines heures)")
+    cat_parser.add_argument('archive')
+    cat_parser.add_argument('--hour', action='append', help="Heure locale des logs : YYYY-MM-DDTHH (répétable)")
+
+    info_parser = subparsers.add_parser('info', help="Résumé d'une archive")
+    info_parser.add_argument('archive')
+
+    verify_parser = subparsers.add_parser('verify', help="Vérifier la restitution à l'identique")
+    verify_parser.add_argument('archive')
+
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        writer = pack(args.inputs, args.output, args.block_lines)
+        size = Path(args.output).stat().st_size
+        print(f"✅ {args.output} : {_format_size(writer.original_bytes)} → {_format_size(size)} "
+              f"({len(writer.blocks)} blocs, {len(writer.templates.values)} gabarits)")
+
+    elif args.command == 'convert':
+        results = convert_directory(args.directory, args.delete_gz, args.block_lines)
+        for archive, target, gz_size, size, kept in results:
+            if not kept:
+                print(f"⏭️  {archive.name} conservé : {target.name} ne serait pas plus petit "
+                      f"({_format_size(size)} contre {_format_size(gz_size)})")
+                continue
+            print(f"✅ {archive.name} ({_format_size(gz_size)}) → {target.name} ({_format_size(size)}, "
+                  f"{gz_size / max(size, 1):.1f}× plus petit)")
+        if not results:
+            print("Aucune archive .gz à convertir")
+
+    elif args.command == 'cat':
+        reader = ArchiveReader(args.archive)
+        hours = set(args.hour) if args.hour else None
+        out = sys.stdout.buffer
+        for line in reader.lines(hours):
+            out.write(line.encode('utf-8', 'surrogateescape') + b'\n')
+
+    elif args.command == 'info':
+        display_info(args.archive)
+
+    elif args.command == 'verify':
+        if not verify(args.archive):
+            print(f"❌ {args.archive} : contenu restitué différent de l'original")
+            return 1
+        print(f"✅ {args.archive} : restitution identique (sha256)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulateur de capacité des sessions WCQS (WC()->session / woocommerce_sessions)
+
+Simulation à événements discrets (échéancier en tas) de l'arrivée des
+clients, de paniers à plusieurs produits mappés, des tests de
+positionnement et du checkout. Modélise ce que le plugin écrit réellement :
+
+- WCQS_Session::set_solved : clé wcqs_testpos_solved_<id> (TTL 30 min),
+  jamais supprimée à l'expiration, seulement lors d'un is_solved ultérieur ;
+- wcqs_solved_tests (optionnel, --solved-tests-list) : liste héritée que
+  seul force_clear_product retire ;
+- WCQS_Token : jetons HMAC sans état, valides 2 h ;
+- la ligne woocommerce_sessions, conservée 48 h après la dernière activité.
+
+Le travail de cleanup_expired / get_all_active_sessions est compté en clés
+parcourues dans get_session_data() à chaque requête.
+
+Usage :
+    python tools/wcqs_capacity_sim.py --users 2000000 --days 1 --json capacite.json
+"""
+
+import argparse
+import heapq
+import json
+import math
+import random
+import sys
+
+from wcqs_journeys import Reservoir
+
+# WCQS_Session::SESSION_TTL, WCQS_Token::TOKEN_TTL
+SESSION_TTL = 1800
+TOKEN_TTL = 7200
+SESSION_PREFIX = 'wcqs_testpos_solved_'
+
+# Durée de vie d'une session WooCommerce (WC_Session_Handler : 48 h)
+WC_SESSION_TTL = 48 * 3600
+
+# Clés WooCommerce présentes dans toute session avec panier
+WC_BASE_KEYS = (
+    'cart', 'cart_totals', 'applied_coupons', 'coupon_discount_totals',
+    'coupon_discount_tax_totals', 'removed_cart_contents', 'customer', 'wc_notices'
+)
+
+# Horodatage de référence (10 chiffres, comme time())
+EPOCH = 1_760_000_000
+
+# Types d'événements (ordre de traitement à horodatage égal)
+ENTRY_EXPIRE, TOKEN_EXPIRE, SESSION_END, SAMPLE, ARRIVAL, CHECKOUT, TEST_DONE = range(7)
+
+
+def php_serialize(value):
+    """Équivalent de serialize() PHP pour les types manipulés par le plugin"""
+    if isinstance(value, bool):
+        return f'b:{int(value)};'
+    if isinstance(value, int):
+        return f'i:{value};'
+    if isinstance(value, float):
+        return f'd:{value!r};'
+    if isinstance(value, str):
+        return f's:{len(value.encode("utf-8"))}:"{value}";'
+    if isinstance(value, dict):
+        items = ''.join(php_serialize(k) + php_serialize(v) for k, v in value.items())
+        return f'a:{len(value)}:{{{items}}}'
+    raise TypeError(type(value))
+
+
+def session_field_bytes(key, value):
+    """Octets d'une clé dans session_value
+
+    WC_Session_Handler::set stocke maybe_serialize($value), puis save_data
+    sérialise le tableau complet : la valeur est donc sérialisée deux fois.
+    """
+    return len(php_serialize(key)) + len(php_serialize(php_serialize(value)).encode('utf-8'))
+
+
+def solved_entry_bytes(product_id):
+    """Octets ajoutés par WCQS_Session::set_solved pour un produit"""
+    return session_field_bytes(f'{SESSION_PREFIX}{product_id}', {
+        'solved': True,
+        'timestamp': EPOCH,
+        'expires': EPOCH + SESSION_TTL,
+        'product_id': product_id
+    })
+
+
+class UserSession:
+    """Session WooCommerce d'un client actif"""
+
+    __slots__ = ('cart', 'entries', 'solved_list', 'bytes', 'keys', 'attempts')
+
+    def __init__(self, cart, base_bytes):
+        self.cart = cart
+        self.entries = {}
+        self.solved_list = {}
+        self.bytes = base_bytes
+        self.keys = len(WC_BASE_KEYS)
+        self.attempts = 0
+
+
+class CapacitySimulator:
+    """Échéancier en tas ; les sessions terminées ne gardent qu'une entrée SESSION_END"""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.horizon = args.days * 86400
+        self.mean_rate = args.users / self.horizon
+        self.peak_rate = self.mean_rate * args.peak_factor
+        self.events = []
+        self.seq = 0
+        self.arrived = 0
+
+        self.products = list(range(args.first_product_id, args.first_product_id + args.products))
+        mapped_count = max(1, round(args.products * args.mapped_ratio))
+        self.mapped = set(self.products[:mapped_count])
+        self.entry_bytes = {pid: solved_entry_bytes(pid) for pid in self.mapped}
+        self.list_item_bytes = {
+            pid: len(php_serialize(pid)) + len(php_serialize({'solved': True, 'timestamp': EPOCH}))
+            for pid in self.mapped
+        }
+
+        # État instantané
+        self.rows = 0
+        self.table_bytes = 0
+        self.stored_entries = 0
+        self.live_entries = 0
+        self.live_tokens = 0
+        self.peaks = {'rows': 0, 'table_bytes': 0, 'stored_entries': 0, 'live_entries': 0,
+                      'live_tokens': 0, 'keys_walked_per_second': 0.0}
+
+        # Statistiques
+        self.outcomes = {'checkout': 0, 'abandoned': 0, 'blocked_attempts': 0, 'revalidations': 0}
+        self.payload_sizes = Reservoir(args.reservoir, self.rng)
+        self.max_payload = 0
+        self.keys_walked = {}
+        self.requests = 0
+        self.interval_requests = 0
+        self.interval_keys = 0
+        self.timeline = []
+
+    # ------------------------------------------------------------------
+    # Échéancier
+    # ------------------------------------------------------------------
+
+    def _schedule(self, time, kind, payload=None):
+        self.seq += 1
+        heapq.heappush(self.events, (time, kind, self.seq, payload))
+
+    def _rate(self, t):
+        """Profil journalier sinusoïdal : creux la nuit, pic à 14 h (moyenne = users / durée)"""
+        phase = 2 * math.pi * ((t % 86400) - 14 * 3600) / 86400
+        return self.mean_rate * (1 + (self.args.peak_factor - 1) * math.cos(phase))
+
+    def _next_arrival(self, now):
+        """Processus de Poisson non homogène (méthode d'amincissement)"""
+        t = now
+        while True:
+            t += self.rng.expovariate(self.peak_rate)
+            if t >= self.horizon:
+                return None
+            if self.rng.random() * self.peak_rate <= self._rate(t):
+                return t
+
+    def _think(self, mean):
+        return self.rng.expovariate(1.0 / mean)
+
+    # ------------------------------------------------------------------
+    # Modèle du plugin
+    # ------------------------------------------------------------------
+
+    def _request(self, session, now):
+        """Une requête front : parcours de get_session_data() puis save_data()"""
+        walked = session.keys
+        self.keys_walked[walked] = self.keys_walked.get(walked, 0) + 1
+        self.requests += 1
+        self.interval_requests += 1
+        self.interval_keys += walked
+
+        if self.args.cleanup_per_request:
+            # Variante : WCQS_Session::cleanup_expired appelé à chaque requête
+            for product_id, expires in list(session.entries.items()):
+                if now > expires:
+                    self._drop_entry(session, product_id)
+
+    def _drop_entry(self, session, product_id):
+        del session.entries[product_id]
+        self._resize(session, -self.entry_bytes[product_id], -1)
+        self.stored_entries -= 1
+
+    def _resize(self, session, delta_bytes, delta_keys=0):
+        session.bytes += delta_bytes
+        session.keys += delta_keys
+        self.table_bytes += delta_bytes
+
+    def _set_solved(self, session, product_id, now):
+        if product_id not in session.entries:
+            self._resize(session, self.entry_bytes[product_id], 1)
+            self.stored_entries += 1
+        session.entries[product_id] = now + SESSION_TTL
+        self.live_entries += 1
+        self._schedule(now + SESSION_TTL, ENTRY_EXPIRE)
+
+        if self.args.solved_tests_list and product_id not in session.solved_list:
+            if not session.solved_list:
+                # Clé + enveloppe s:N:"a:K:{...}"; de la liste (≈ 16 octets)
+                self._resize(session, len(php_serialize('wcqs_solved_tests')) + 16, 1)
+            session.solved_list[product_id] = now
+            self._resize(session, self.list_item_bytes[product_id])
+
+    def _is_solved(self, session, product_id, now):
+        expires = session.entries.get(product_id)
+        if expires is None:
+            return False
+        if now > expires:
+            # is_solved nettoie la clé expirée qu'il vient de lire
+            self._drop_entry(session, product_id)
+            self.outcomes['revalidations'] += 1
+            return False
+        return True
+
+    def _finish(self, session, now, outcome):
+        self.outcomes[outcome] += 1
+        if outcome == 'checkout':
+            # Commande passée : le panier est vidé, les clés WCQS restent
+            self._resize(session, -len(session.cart) * self.args.cart_item_bytes)
+        self.payload_sizes.add(session.bytes)
+        self.max_payload = max(self.max_payload, session.bytes)
+        self._schedule(now + WC_SESSION_TTL, SESSION_END, (session.bytes, len(session.entries)))
+
+    def _on_arrival(self, now):
+        self.arrived += 1
+        following = self._next_arrival(now)
+        if following is not None:
+            self._schedule(following, ARRIVAL)
+
+        size = 1
+        while size < self.args.products and self.rng.random() > 1.0 / self.args.products_per_cart:
+            size += 1
+        cart = self.rng.sample(self.products, size)
+
+        session = UserSession(cart, self.args.base_bytes + size * self.args.cart_item_bytes)
+        self.rows += 1
+        self.table_bytes += session.bytes
+        for _ in cart:
+            self._request(session, now)  # ajouts au panier
+        self._schedule(now + self._think(self.args.think_time), CHECKOUT, session)
+
+    def _on_checkout(self, session, now):
+        self._request(session, now)
+        session.attempts += 1
+        pending = [pid for pid in session.cart if pid in self.mapped and not self._is_solved(session, pid, now)]
+
+        if not pending:
+            self._finish(session, now, 'checkout')
+            return
+
+        self.outcomes['blocked_attempts'] += 1
+        if session.attempts > self.args.max_attempts or self.rng.random() < self.args.abandon_rate:
+            self._finish(session, now, 'abandoned')
+            return
+
+        # Redirection vers la page de test : un jeton HMAC par produit en attente
+        product_id = pending[0]
+        self._request(session, now)
+        self.live_tokens += 1
+        self._schedule(now + TOKEN_TTL, TOKEN_EXPIRE)
+        self._schedule(now + self._think(self.args.test_duration), TEST_DONE, (session, product_id))
+
+    def _on_test_done(self, session, product_id, now):
+        self._request(session, now)
+        if self.rng.random() < self.args.pass_rate:
+            self._set_solved(session, product_id, now)
+        self._schedule(now + self._think(self.args.think_time), CHECKOUT, session)
+
+    def _sample(self, now):
+        per_second = self.interval_keys / self.args.sample_interval
+        point = {
+            'time': now,
+            'rows': self.rows,
+            'table_bytes': self.table_bytes,
+            'stored_entries': self.stored_entries,
+            'live_entries': self.live_entries,
+            'expired_entries_stored': max(0, self.stored_entries - self.live_entries),
+            'live_tokens': self.live_tokens,
+            'requests_per_second': self.interval_requests / self.args.sample_interval,
+            'keys_walked_per_second': per_second
+        }
+        self.timeline.append(point)
+        for key in ('rows', 'table_bytes', 'stored_entries', 'live_entries', 'live_tokens',
+                    'keys_walked_per_second'):
+            self.peaks[key] = max(self.peaks[key], point[key])
+        self.interval_requests = 0
+        self.interval_keys = 0
+
+        if self.events:
+            self._schedule(now + self.args.sample_interval, SAMPLE)
+
+    def run(self):
+        first = self._next_arrival(0.0)
+        if first is not None:
+            self._schedule(first, ARRIVAL)
+        self._schedule(self.args.sample_interval, SAMPLE)
+
+        end = self.horizon + WC_SESSION_TTL if self.args.drain else self.horizon
+        while self.events and self.events[0][0] <= end:
+            now, kind, _, payload = heapq.heappop(self.events)
+            if kind == ARRIVAL:
+                self._on_arrival(now)
+            elif kind == CHECKOUT:
+                self._on_checkout(payload, now)
+            elif kind == TEST_DONE:
+                self._on_test_done(payload[0], payload[1], now)
+            elif kind == ENTRY_EXPIRE:
+                self.live_entries -= 1
+            elif kind == TOKEN_EXPIRE:
+                self.live_tokens -= 1
+            elif kind == SESSION_END:
+                size, entries = payload
+                self.rows -= 1
+                self.table_bytes -= size
+                self.stored_entries -= entries
+            elif kind == SAMPLE:
+                self._sample(now)
+        return self.report()
+
+    def report(self):
+        total = sum(self.keys_walked.values())
+
+        def walked_percentile(q):
+            threshold = q / 100 * total
+            running = 0
+            for keys, count in sorted(self.keys_walked.items()):
+                running += count
+                if running >= threshold:
+                    return keys
+            return None
+
+        return {
+            'parameters': vars(self.args),
+            'users': self.arrived,
+            'outcomes': self.outcomes,
+            'requests': self.requests,
+            'payload_bytes': {
+                **{f'p{q}': self.payload_sizes.percentile(q) for q in (50, 90, 99)},
+                'max': self.max_payload
+            },
+            'keys_walked_per_request': {
+                **{f'p{q}': walked_percentile(q) for q in (50, 90, 99)},
+                'max': max(self.keys_walked) if self.keys_walked else None,
+                'mean': sum(k * c for k, c in self.keys_walked.items()) / total if total else None
+            },
+            'peaks': self.peaks,
+            'timeline': self.timeline
+        }
+
+
+def _format_bytes(value):
+    for unit in ('o', 'Ko', 'Mo', 'Go'):
+        if abs(value) < 1024 or unit == 'Go':
+            return f'{value:.1f} {unit}' if unit != 'o' else f'{value:.0f} o'
+        value /= 1024
+
+
+def display_report(report):
+    peaks = report['peaks']
+    payload = report['payload_bytes']
+    walked = report['keys_walked_per_request']
+    outcomes = report['outcomes']
+
+    print("\n" + "=" * 72)
+    print("📦 CAPACITÉ DES SESSIONS WCQS")
+    print("=" * 72)
+    print(f"Clients simulés: {report['users']:,} • requêtes: {report['requests']:,}")
+    print(f"Checkouts: {outcomes['checkout']:,} • abandons: {outcomes['abandoned']:,} • "
+          f"checkouts bloqués: {outcomes['blocked_attempts']:,} • re-tests (TTL dépassé): "
+          f"{outcomes['revalidations']:,}")
+
+    print("\nTaille session_value en fin de session :")
+    print(f"   p50 {_format_bytes(payload['p50'] or 0)} • p90 {_format_bytes(payload['p90'] or 0)} • "
+          f"p99 {_format_bytes(payload['p99'] or 0)} • max {_format_bytes(payload['max'])}")
+
+    print("\nClés parcourues par requête (cleanup_expired / get_all_active_sessions) :")
+    print(f"   moyenne {walked['mean'] or 0:.1f} • p50 {walked['p50']} • p99 {walked['p99']} • max {walked['max']}")
+
+    print("\nPics :")
+    print(f"   lignes woocommerce_sessions : {peaks['rows']:,}")
+    print(f"   volume session_value        : {_format_bytes(peaks['table_bytes'])}")
+    print(f"   clés wcqs_testpos_solved_*  : {peaks['stored_entries']:,} stockées, "
+          f"{peaks['live_entries']:,} non expirées")
+    print(f"   jetons HMAC valides         : {peaks['live_tokens']:,}")
+    print(f"   clés parcourues / seconde   : {peaks['keys_walked_per_second']:,.0f}")
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulateur de capacité des sessions WCQS")
+    parser.add_argument('--users', type=int, default=100000, help="Clients arrivant sur la période")
+    parser.add_argument('--days', type=float, default=1.0, help="Durée de la période d'arrivée (jours)")
+    parser.add_argument('--peak-factor', type=float, default=2.0, help="Rapport pic / moyenne du trafic journalier")
+    parser.add_argument('--products', type=int, default=50, help="Produits du catalogue")
+    parser.add_argument('--first-product-id', type=int, default=1000)
+    parser.add_argument('--mapped-ratio', type=float, default=0.6, help="Part des produits avec test mappé")
+    parser.add_argument('--products-per-cart', type=float, default=1.6, help="Taille moyenne du panier")
+    parser.add_argument('--think-time', type=float, default=90.0, help="Délai moyen entre deux actions (s)")
+    parser.add_argument('--test-duration', type=float, default=600.0, help="Durée moyenne d'un test (s)")
+    parser.add_argument('--pass-rate', type=float, default=0.85, help="Probabilité de réussite d'un test")
+    parser.add_argument('--abandon-rate', type=float, default=0.15, help="Abandon à chaque checkout bloqué")
+    parser.add_argument('--max-attempts', type=int, default=12, help="Tentatives de checkout avant abandon")
+    parser.add_argument('--base-bytes', type=int, default=1800, help="Octets WooCommerce hors panier")
+    parser.add_argument('--cart-item-bytes', type=int, default=420, help="Octets par ligne de panier")
+    parser.add_argument('--solved-tests-list', action='store_true',
+                        help="Modéliser aussi la liste héritée wcqs_solved_tests")
+    parser.add_argument('--cleanup-per-request', action='store_true',
+                        help="Appeler cleanup_expired à chaque requête (variante)")
+    parser.add_argument('--sample-interval', type=float, default=300.0, help="Pas de la série temporelle (s)")
+    parser.add_argument('--drain', action='store_true', help="Simuler jusqu'à expiration de toutes les sessions")
+    parser.add_argument('--reservoir', type=int, default=100000, help="Échantillons pour les percentiles")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Écrire le rapport JSON (avec série temporelle) dans ce fichier")
+    args = parser.parse_args()
+    if not 1.0 <= args.peak_factor <= 2.0:
+        parser.error("--peak-factor doit être compris entre 1 et 2 (profil sinusoïdal)")
+
+    report = CapacitySimulator(args).run()
+    display_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Rapport JSON: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
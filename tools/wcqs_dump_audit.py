@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Audit hors ligne d'un dump mysqldump : options, transients et usermeta WCQS
+
+Lit le fichier SQL en flux (instruction par instruction, .sql ou .sql.gz),
+sans l'importer dans une base, et mesure ce que le plugin laisse derrière
+lui :
+
+- taille des options wcqs_* et autoload de wcqs_testpos_mapping (forcé à
+  "no" par Activator / Plugin::normalize_mapping_option) ;
+- total autoload chargé par wp_load_alloptions() et plus grosses options ;
+- transients wcqs_validation_<produit> expirés, orphelins ou sans expiration ;
+- usermeta de validation par produit (_wcqs_testpos_ok_<id> et variantes
+  lues par Cart_Guard::is_test_validated) ;
+- sessions WooCommerce contenant des clés wcqs_testpos_solved_*.
+
+Usage :
+    python tools/wcqs_dump_audit.py dump.sql.gz [--now 2025-09-26T12:00:00] [--json audit.json]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+from datetime import datetime
+
+# Valeurs d'autoload chargées par wp_load_alloptions() (WordPress < 6.6 et >= 6.6)
+AUTOLOAD_VALUES = ('yes', 'on', 'auto', 'auto-on')
+
+# Ordre des colonnes si le dump ne contient ni liste de colonnes ni CREATE TABLE
+DEFAULT_COLUMNS = {
+    'options': ('option_id', 'option_name', 'option_value', 'autoload'),
+    'usermeta': ('umeta_id', 'user_id', 'meta_key', 'meta_value'),
+    'woocommerce_sessions': ('session_id', 'session_key', 'session_value', 'session_expiry')
+}
+
+# Clés usermeta de validation lues par Cart_Guard::is_test_validated
+USERMETA_PATTERN = re.compile(r'^(_wcqs_testpos_ok|_wcqs_testpos_validated|_wcqs_test|_qualiopi_test)_(\d+)$')
+
+WCQS_TRANSIENT_PATTERN = re.compile(r'^wcqs_validation_(\d+)$')
+
+# Cart_Guard : une validation en usermeta est valable 24 h
+USERMETA_TTL = 86400
+
+TOP_AUTOLOAD = 15
+
+INSERT_PATTERN = re.compile(r'^INSERT\s+(?:IGNORE\s+)?INTO\s+`?(\w+)`?\s*(?:\(([^)]*)\))?\s*VALUES\s*', re.I)
+CREATE_PATTERN = re.compile(r'^CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?', re.I)
+COLUMN_PATTERN = re.compile(r'^\s*`(\w+)`\s')
+
+# Jetons d'un tuple VALUES (chaîne texte lue en latin-1 : 1 caractère = 1 octet)
+VALUE_TOKEN = re.compile(
+    r"\s*(?:'([^'\\]*(?:(?:\\.|'')[^'\\]*)*)'|(NULL)|(0x[0-9A-Fa-f]*)|([-+0-9.eE]+)|([(),;]))",
+    re.S
+)
+
+MYSQL_ESCAPES = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+ESCAPE_PATTERN = re.compile(r"\\(.)|''", re.S)
+
+
+def unescape(value):
+    if '\\' not in value and "''" not in value:
+        return value
+    return ESCAPE_PATTERN.sub(lambda m: MYSQL_ESCAPES.get(m.group(1), m.group(1)) if m.group(1) else "'", value)
+
+
+def table_kind(table):
+    """Rattache une table préfixée (wp_options, wp2_usermeta...) à son type"""
+    for kind in DEFAULT_COLUMNS:
+        if table.endswith('_' + kind) or table == kind:
+            return kind
+    return None
+
+
+def iter_tuples(text, position):
+    """Tuples d'une liste VALUES à partir de position ; s'arrête en fin de texte ou au ';'
+
+    Retourne (tuples, terminé).
+    """
+    rows = []
+    row = None
+    length = len(text)
+    while position < length:
+        match = VALUE_TOKEN.match(text, position)
+        if not match:
+            break
+        position = match.end()
+        string, null, hexa, number, punct = match.groups()
+        if punct == '(':
+            row = []
+        elif punct == ')':
+            rows.append(row)
+            row = None
+        elif punct == ';':
+            return rows, True
+        elif punct == ',':
+            continue
+        elif row is not None:
+            if string is not None:
+                row.append(unescape(string))
+            elif null:
+                row.append(None)
+            else:
+                row.append(hexa or number)
+    return rows, False
+
+
+class DumpAuditor:
+    """Agrégation en un passage
+
+    La mémoire dépend du nombre de transients et de sessions (noms et tailles
+    uniquement), pas de la taille du dump ni des valeurs.
+
+    `now` (epoch) sert de référence pour les expirations.
+    """
+
+    def __init__(self, now):
+        self.now = now
+        self.columns = {}
+        self.current_create = None
+
+        self.options = 0
+        self.wcqs_options = {}
+        self.autoload_bytes = 0
+        self.autoload_count = 0
+        self.top_autoload = []
+
+        self.transients = {}
+        self.transient_timeouts = {}
+
+        self.usermeta_by_product = {}
+        self.usermeta_keys = {}
+        self.usermeta_users = set()
+
+        self.sessions = 0
+        self.session_bytes = []
+        self.sessions_with_wcqs = 0
+        self.wcqs_session_keys = 0
+
+    # ------------------------------------------------------------------
+    # Lecture du dump
+    # ------------------------------------------------------------------
+
+    def feed(self, lines):
+        insert = None  # (kind, columns) d'un INSERT multi-lignes en cours
+        for line in lines:
+            if insert is not None:
+                rows, done = iter_tuples(line, 0)
+                self._rows(insert, rows)
+                if done:
+                    insert = None
+                continue
+
+            if line.startswith('INSERT'):
+                match = INSERT_PATTERN.match(line)
+                if not match:
+                    continue
+                kind = table_kind(match.group(1))
+                if kind is None:
+                    continue
+                if match.group(2):
+                    columns = tuple(c.strip().strip('`') for c in match.group(2).split(','))
+                else:
+                    columns = self.columns.get(match.group(1), DEFAULT_COLUMNS[kind])
+                rows, done = iter_tuples(line, match.end())
+                self._rows((kind, columns), rows)
+                if not done:
+                    insert = (kind, columns)
+            elif line.startswith('CREATE TABLE'):
+                match = CREATE_PATTERN.match(line)
+                self.current_create = match.group(1) if match else None
+                if self.current_create:
+                    self.columns[self.current_create] = ()
+            elif self.current_create:
+                column = COLUMN_PATTERN.match(line)
+                if column:
+                    self.columns[self.current_create] += (column.group(1),)
+                elif line.startswith(')'):
+                    self.current_create = None
+
+    def _rows(self, insert, rows):
+        kind, columns = insert
+        handler = getattr(self, f'_row_{kind}')
+        for row in rows:
+            if len(row) == len(columns):
+                handler(dict(zip(columns, row)))
+
+    # ------------------------------------------------------------------
+    # Tables
+    # ------------------------------------------------------------------
+
+    def _row_options(self, row):
+        name = row.get('option_name') or ''
+        value = row.get('option_value') or ''
+        autoload = (row.get('autoload') or '').lower()
+        size = len(value)
+        self.options += 1
+
+        if autoload in AUTOLOAD_VALUES:
+            self.autoload_bytes += size
+            self.autoload_count += 1
+            self._track_top(name, size)
+
+        for prefix in ('_transient_timeout_', '_site_transient_timeout_'):
+            if name.startswith(prefix):
+                transient = prefix.replace('timeout_', '') + name[len(prefix):]
+                self.transient_timeouts[transient] = int(value) if value.isdigit() else 0
+                return
+        if name.startswith(('_transient_', '_site_transient_')):
+            self.transients[name] = (size, autoload in AUTOLOAD_VALUES)
+            return
+
+        if name.startswith('wcqs_'):
+            info = {'bytes': size, 'autoload': autoload}
+            if name == 'wcqs_testpos_mapping':
+                count = re.match(r'a:(\d+):', value)
+                info['entries'] = int(count.group(1)) if count else None
+                info['format'] = 'serialized' if count else ('json' if value.startswith('{') else 'other')
+            self.wcqs_options[name] = info
+
+    def _track_top(self, name, size):
+        if len(self.top_autoload) < TOP_AUTOLOAD:
+            self.top_autoload.append((size, name))
+            self.top_autoload.sort()
+        elif size > self.top_autoload[0][0]:
+            self.top_autoload[0] = (size, name)
+            self.top_autoload.sort()
+
+    def _row_usermeta(self, row):
+        match = USERMETA_PATTERN.match(row.get('meta_key') or '')
+        if not match:
+            return
+        variant, product_id = match.group(1), int(match.group(2))
+        counters = self.usermeta_by_product.setdefault(product_id, {'rows': 0, 'bytes': 0, 'expired': 0})
+        counters['rows'] += 1
+        value = row.get('meta_value') or ''
+        counters['bytes'] += len(value)
+        self.usermeta_keys[variant] = self.usermeta_keys.get(variant, 0) + 1
+        self.usermeta_users.add(row.get('user_id'))
+        try:
+            if self.now - datetime.fromisoformat(value).timestamp() >= USERMETA_TTL:
+                counters['expired'] += 1
+        except ValueError:
+            pass
+
+    def _row_woocommerce_sessions(self, row):
+        value = row.get('session_value') or ''
+        self.sessions += 1
+        self.session_bytes.append(len(value))
+        keys = value.count('wcqs_testpos_solved_')
+        if keys:
+            self.sessions_with_wcqs += 1
+            self.wcqs_session_keys += keys
+
+    # ------------------------------------------------------------------
+    # Rapport
+    # ------------------------------------------------------------------
+
+    def report(self):
+        now = self.now
+        transients = {'total': 0, 'bytes': 0, 'expired': 0, 'expired_bytes': 0,
+                      'without_timeout': 0, 'autoloaded_bytes': 0, 'orphaned_timeouts': 0}
+        wcqs_transients = {}
+
+        for name, (size, autoloaded) in self.transients.items():
+            transients['total'] += 1
+            transients['bytes'] += size
+            if autoloaded:
+                transients['autoloaded_bytes'] += size
+            timeout = self.transient_timeouts.get(name)
+            expired = timeout is not None and timeout < now
+            if timeout is None:
+                transients['without_timeout'] += 1
+            elif expired:
+                transients['expired'] += 1
+                transients['expired_bytes'] += size
+
+            short_name = name.split('transient_', 1)[1]
+            match = WCQS_TRANSIENT_PATTERN.match(short_name)
+            if match:
+                data = wcqs_transients.setdefault(int(match.group(1)), {'bytes': 0, 'expired': False, 'timeout': None})
+                data.update(bytes=size, expired=expired, timeout=timeout)
+
+        for name in self.transient_timeouts:
+            if name not in self.transients:
+                transients['orphaned_timeouts'] += 1
+                match = WCQS_TRANSIENT_PATTERN.match(name.split('transient_', 1)[1])
+                if match:
+                    wcqs_transients.setdefault(int(match.group(1)), {})['orphaned_timeout'] = True
+
+        session_sizes = sorted(self.session_bytes)
+
+        def size_percentile(q):
+            if not session_sizes:
+                return None
+            return session_sizes[min(len(session_sizes) - 1, round(q / 100 * (len(session_sizes) - 1)))]
+
+        wcqs_autoload = sum(info['bytes'] for info in self.wcqs_options.values()
+                            if info['autoload'] in AUTOLOAD_VALUES)
+        return {
+            'now': datetime.fromtimestamp(now).isoformat(),
+            'options': {
+                'total': self.options,
+                'autoload_count': self.autoload_count,
+                'autoload_bytes': self.autoload_bytes,
+                'wcqs_autoload_bytes': wcqs_autoload,
+                'top_autoload': [{'name': name, 'bytes': size} for size, name in reversed(self.top_autoload)],
+                'wcqs': self.wcqs_options
+            },
+            'transients': transients,
+            'wcqs_transients': dict(sorted(wcqs_transients.items())),
+            'usermeta': {
+                'rows': sum(c['rows'] for c in self.usermeta_by_product.values()),
+                'users': len(self.usermeta_users),
+                'by_key': self.usermeta_keys,
+                'by_product': dict(sorted(self.usermeta_by_product.items()))
+            },
+            'woocommerce_sessions': {
+                'rows': self.sessions,
+                'bytes': sum(session_sizes),
+                'p50_bytes': size_percentile(50),
+                'p99_bytes': size_percentile(99),
+                'max_bytes': session_sizes[-1] if session_sizes else None,
+                'with_wcqs_keys': self.sessions_with_wcqs,
+                'wcqs_keys': self.wcqs_session_keys
+            }
+        }
+
+
+def _open_dump(path):
+    # latin-1 : lecture sans erreur et longueur en caractères = taille en octets
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='latin-1', newline='\n')
+    return open(path, 'r', encoding='latin-1', newline='\n')
+
+
+def _format_size(size):
+    if size is None:
+        return '-'
+    for unit in ('o', 'Ko', 'Mo', 'Go'):
+        if size < 1024 or unit == 'Go':
+            return f'{size:.0f} {unit}' if unit == 'o' else f'{size:.1f} {unit}'
+        size /= 1024
+
+
+def display_report(report):
+    options = report['options']
+    transients = report['transients']
+    usermeta = report['usermeta']
+    sessions = report['woocommerce_sessions']
+
+    print("\n" + "=" * 72)
+    print("🗄️  AUDIT DU DUMP (options, transients, usermeta)")
+    print("=" * 72)
+
+    print(f"\nAutoload : {options['autoload_count']:,} options, {_format_size(options['autoload_bytes'])} "
+          f"chargés par wp_load_alloptions() (dont WCQS : {_format_size(options['wcqs_autoload_bytes'])})")
+    for item in options['top_autoload']:
+        print(f"   {_format_size(item['bytes']):>10}  {item['name']}")
+
+    print("\nOptions WCQS :")
+    for name, info in sorted(options['wcqs'].items()):
+        flag = '⚠️ ' if info['autoload'] in AUTOLOAD_VALUES else '   '
+        extra = f" • {info['entries']} entrées ({info['format']})" if 'entries' in info else ''
+        print(f"   {flag}{name:<28}{_format_size(info['bytes']):>10}  autoload={info['autoload']}{extra}")
+
+    print(f"\nTransients : {transients['total']:,} ({_format_size(transients['bytes'])}) • "
+          f"expirés {transients['expired']:,} ({_format_size(transients['expired_bytes'])}) • "
+          f"sans expiration {transients['without_timeout']:,} • timeouts orphelins "
+          f"{transients['orphaned_timeouts']:,} • autoloadés {_format_size(transients['autoloaded_bytes'])}")
+    wcqs_transients = report['wcqs_transients']
+    if wcqs_transients:
+        expired = sum(1 for t in wcqs_transients.values() if t.get('expired'))
+        orphaned = sum(1 for t in wcqs_transients.values() if t.get('orphaned_timeout'))
+        print(f"   wcqs_validation_* : {len(wcqs_transients)} produits, {expired} expirés, {orphaned} orphelins")
+
+    print(f"\nUsermeta de validation : {usermeta['rows']:,} lignes, {usermeta['users']:,} utilisateurs")
+    for key, count in sorted(usermeta['by_key'].items()):
+        print(f"   {key}_<id> : {count:,}")
+    if usermeta['by_product']:
+        print(f"   {'Produit':>8}{'Lignes':>10}{'Expirées':>10}{'Taille':>12}")
+        for product_id, data in usermeta['by_product'].items():
+            print(f"   {product_id:>8}{data['rows']:>10,}{data['expired']:>10,}{_format_size(data['bytes']):>12}")
+
+    if sessions['rows']:
+        print(f"\nSessions WooCommerce : {sessions['rows']:,} ({_format_size(sessions['bytes'])}) • "
+              f"p50 {_format_size(sessions['p50_bytes'])} • p99 {_format_size(sessions['p99_bytes'])} • "
+              f"max {_format_size(sessions['max_bytes'])}")
+        print(f"   {sessions['with_wcqs_keys']:,} sessions avec {sessions['wcqs_keys']:,} clés wcqs_testpos_solved_*")
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit hors ligne d'un dump mysqldump (options, transients, usermeta WCQS)")
+    parser.add_argument('dump', help="Fichier .sql ou .sql.gz produit par mysqldump / wp db export")
+    parser.add_argument('--now', help="Date de référence ISO pour les expirations (défaut : date du fichier de dump)")
+    parser.add_argument('--json', help="Écrire le rapport JSON dans ce fichier")
+    args = parser.parse_args()
+
+    now = datetime.fromisoformat(args.now).timestamp() if args.now else os.path.getmtime(args.dump)
+    auditor = DumpAuditor(now)
+    with _open_dump(args.dump) as handle:
+        auditor.feed(handle)
+
+    report = auditor.report()
+    display_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Rapport JSON: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
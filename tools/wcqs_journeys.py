@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reconstruction des parcours utilisateurs et entonnoir de conversion WCQS
+
+Regroupe les lignes WCQS_Logger par utilisateur ([USER:id]) en sessions
+séparées par une inactivité de 30 minutes (WCQS_Session::SESSION_TTL), puis
+calcule par produit l'entonnoir panier → redirection test → page de test →
+checkout et les percentiles du temps jusqu'au checkout.
+
+Lecture en un seul passage : les sessions inactives sont évincées via un tas
+(mémoire bornée par le nombre d'utilisateurs actifs simultanément).
+
+Usage :
+    python tools/wcqs_journeys.py /chemin/uploads/wcqs-logs [--json rapport.json]
+"""
+
+import argparse
+import heapq
+import json
+import random
+import re
+import sys
+
+from wcqs_logs import expand_paths, iter_entries
+
+# WCQS_Session::SESSION_TTL
+SESSION_GAP = 1800
+
+# Taille du réservoir d'échantillons par produit pour les percentiles
+RESERVOIR_SIZE = 10000
+
+FUNNEL_STEPS = ('cart', 'test_redirect', 'test_page', 'checkout')
+
+CART_URI = re.compile(r'^/(?:panier|cart)/?(?:\?|$)')
+CHECKOUT_URI = re.compile(r'^/(?:commander|checkout)/|/wc/store(?:/v\d+)?/checkout')
+TEST_PAGE_PRODUCT = re.compile(r'[?&]wcqs_product_id=(\d+)')
+MESSAGE_PRODUCT = re.compile(r'\bproduct (\d+)\b')
+
+
+class Session:
+    """Parcours d'un utilisateur entre deux périodes d'inactivité"""
+
+    __slots__ = ('user_id', 'start', 'last_seen', 'first_seen_product', 'steps')
+
+    def __init__(self, user_id, timestamp):
+        self.user_id = user_id
+        self.start = timestamp
+        self.last_seen = timestamp
+        self.first_seen_product = {}
+        self.steps = {}
+
+    def mark(self, product_id, step, timestamp):
+        self.first_seen_product.setdefault(product_id, timestamp)
+        self.steps.setdefault(product_id, {}).setdefault(step, timestamp)
+
+
+class Reservoir:
+    """Échantillonnage uniforme de taille fixe (algorithme R)"""
+
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.values = []
+        self.seen = 0
+
+    def add(self, value):
+        self.seen += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            index = self.rng.randrange(self.seen)
+            if index < self.size:
+                self.values[index] = value
+
+    def percentile(self, q):
+        if not self.values:
+            return None
+        ordered = sorted(self.values)
+        position = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+        return ordered[position]
+
+
+class JourneyAnalyzer:
+    """Sessionisation en flux et agrégation de l'entonnoir par produit"""
+
+    def __init__(self, gap=SESSION_GAP, include_anonymous=False, seed=0):
+        self.gap = gap
+        self.include_anonymous = include_anonymous
+        self.rng = random.Random(seed)
+        self.sessions = {}
+        self.expiry_heap = []
+        self.funnel = {}
+        self.time_to_checkout = {}
+        self.sessions_closed = 0
+        self.peak_active_sessions = 0
+
+    def _products_in(self, entry):
+        products = set()
+        context = entry['context'] if isinstance(entry['context'], dict) else {}
+        if isinstance(context.get('product_id'), int):
+            products.add(context['product_id'])
+        products.update(int(p) for p in TEST_PAGE_PRODUCT.findall(entry['uri']))
+        products.update(int(p) for p in MESSAGE_PRODUCT.findall(entry['message']))
+        return products
+
+    def _evict_idle(self, now):
+        """Clôture les sessions inactives depuis plus de `gap` secondes"""
+        while self.expiry_heap and self.expiry_heap[0][0] + self.gap < now:
+            _, user_id = heapq.heappop(self.expiry_heap)
+            session = self.sessions[user_id]
+            if session.last_seen + self.gap < now:
+                self._close(self.sessions.pop(user_id))
+            else:
+                # Session vue depuis : replanifier (une seule entrée par session dans le tas)
+                heapq.heappush(self.expiry_heap, (session.last_seen, user_id))
+
+    def _close(self, session):
+        self.sessions_closed += 1
+        for product_id, steps in session.steps.items():
+            counters = self.funnel.setdefault(product_id, {'sessions': 0, **{s: 0 for s in FUNNEL_STEPS}})
+            counters['sessions'] += 1
+            for step in steps:
+                counters[step] += 1
+
+            if 'checkout' in steps:
+                reservoir = self.time_to_checkout.setdefault(
+                    product_id, Reservoir(RESERVOIR_SIZE, self.rng)
+                )
+                reservoir.add(steps['checkout'] - session.first_seen_product[product_id])
+
+    def observe(self, entry):
+        timestamp = entry['timestamp']
+        if timestamp is None:
+            return
+        user_id = entry['user_id']
+        if user_id == 0 and not self.include_anonymous:
+            return
+
+        self._evict_idle(timestamp)
+
+        session = self.sessions.get(user_id)
+        if session is None:
+            session = self.sessions[user_id] = Session(user_id, timestamp)
+            heapq.heappush(self.expiry_heap, (timestamp, user_id))
+            self.peak_active_sessions = max(self.peak_active_sessions, len(self.sessions))
+
+        session.last_seen = max(session.last_seen, timestamp)
+
+        uri = entry['uri']
+        message = entry['message']
+        products = self._products_in(entry)
+
+        if CART_URI.search(uri):
+            for product_id in products:
+                session.mark(product_id, 'cart', timestamp)
+
+        # Cart_Guard::should_block_checkout → redirection vers la page de test
+        if message == 'Cart_Guard: Blocking checkout':
+            for product_id in products or session.steps.keys():
+                session.mark(product_id, 'test_redirect', timestamp)
+
+        for product_id in TEST_PAGE_PRODUCT.findall(uri):
+            session.mark(int(product_id), 'test_page', timestamp)
+
+        if CHECKOUT_URI.search(uri) and (
+            message == 'Cart_Guard: Allowing checkout' or 'order-received' in uri
+        ):
+            for product_id in products or session.steps.keys():
+                session.mark(product_id, 'checkout', timestamp)
+
+    def finish(self):
+        """Clôture toutes les sessions encore ouvertes en fin de flux"""
+        for session in self.sessions.values():
+            self._close(session)
+        self.sessions = {}
+        self.expiry_heap = []
+
+    def report(self):
+        products = {}
+        for product_id, counters in sorted(self.funnel.items()):
+            reservoir = self.time_to_checkout.get(product_id)
+            products[product_id] = {
+                **counters,
+                'conversion_rate': counters['checkout'] / counters['sessions'] if counters['sessions'] else 0.0,
+                'time_to_checkout': {
+                    f'p{q}': reservoir.percentile(q) if reservoir else None
+                    for q in (50, 90, 99)
+                }
+            }
+        return {
+            'session_gap_seconds': self.gap,
+            'sessions': self.sessions_closed,
+            'peak_active_sessions': self.peak_active_sessions,
+            'products': products
+        }
+
+
+def _format_duration(seconds):
+    if seconds is None:
+        return '-'
+    minutes, seconds = divmod(int(seconds), 60)
+    return f'{minutes}m{seconds:02d}s'
+
+
+def display_report(report):
+    print("\n" + "=" * 96)
+    print("🧭 ENTONNOIR PAR PRODUIT")
+    print("=" * 96)
+    print(f"Sessions: {report['sessions']} (pic simultané: {report['peak_active_sessions']}, "
+          f"inactivité: {report['session_gap_seconds'] // 60} min)\n")
+    print(f"{'Produit':>8}{'Sessions':>10}{'Panier':>9}{'Redirigé':>10}{'Test':>8}"
+          f"{'Checkout':>10}{'Conv.':>8}{'p50':>10}{'p90':>10}{'p99':>10}")
+    for product_id, data in report['products'].items():
+        ttc = data['time_to_checkout']
+        print(f"{product_id:>8}{data['sessions']:>10}{data['cart']:>9}{data['test_redirect']:>10}"
+              f"{data['test_page']:>8}{data['checkout']:>10}{data['conversion_rate'] * 100:>7.1f}%"
+              f"{_format_duration(ttc['p50']):>10}{_format_duration(ttc['p90']):>10}"
+              f"{_format_duration(ttc['p99']):>10}")
+    print("=" * 96)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parcours utilisateurs et entonnoir WCQS")
+    parser.add_argument('paths', nargs='+', help="Fichiers wcqs-*.log[.gz] ou dossier wcqs-logs")
+    parser.add_argument('--gap', type=int, default=SESSION_GAP, help="Inactivité (s) séparant deux sessions")
+    parser.add_argument('--include-anonymous', action='store_true',
+                        help="Inclure USER:0 (tous les visiteurs anonymes regroupés)")
+    parser.add_argument('--json', help="Écrire le rapport JSON dans ce fichier")
+    args = parser.parse_args()
+
+    analyzer = JourneyAnalyzer(gap=args.gap, include_anonymous=args.include_anonymous)
+    for entry in iter_entries(expand_paths(args.paths)):
+        analyzer.observe(entry)
+    analyzer.finish()
+
+    report = analyzer.report()
+    display_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Rapport JSON: {args.json}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
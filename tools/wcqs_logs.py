@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lecture des logs WCQS_Logger pour les outils d'analyse Python
+
+Format d'une ligne (voir WCQS_Logger::log_raw et LOGS.md) :
+    [TIMESTAMP] LEVEL   [USER:ID] [URI] MESSAGE {CONTEXT}
+
+Fichiers : wcqs-YYYY-MM-DD.log (actif) et wcqs-YYYY-MM-DD.log.<ts>.gz (archives
+créées par WCQS_Logger::rotate_if_needed)
+"""
+
+import gzip
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+
+# Même expression que WCQS_Logger::read_logs
+LINE_PATTERN = re.compile(r'^\[([^\]]+)\]\s+(\S+)\s+\[USER:(\d+)\]\s+\[([^\]]+)\]\s+(.*)$')
+
+LOG_FILE_PATTERN = re.compile(r'^wcqs-(\d{4}-\d{2}-\d{2})\.log(?:\.(\d+)\.gz)?$')
+
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+_json_decoder = json.JSONDecoder()
+
+
+def split_context(text):
+    """Sépare le message du contexte JSON final éventuel
+
+    Retourne (message, context) ; context vaut None si la ligne n'en a pas.
+    """
+    if not text.endswith(('}', ']')):
+        return text, None
+
+    position = text.find(' {')
+    while position != -1:
+        try:
+            context, end = _json_decoder.raw_decode(text, position + 1)
+            if end == len(text):
+                return text[:position], context
+        except ValueError:
+            pass
+        position = text.find(' {', position + 1)
+
+    return text, None
+
+
+def parse_timestamp(value):
+    """Timestamp ISO 8601 (current_time('c')) -> epoch en secondes, None si invalide"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+def parse_line(line):
+    """Parse une ligne de log, retourne un dict ou None si le format ne correspond pas"""
+    match = LINE_PATTERN.match(line.rstrip('\r\n'))
+    if not match:
+        return None
+
+    message, context = split_context(match.group(5))
+    return {
+        'datetime': match.group(1),
+        'timestamp': parse_timestamp(match.group(1)),
+        'level': match.group(2).strip(),
+        'user_id': int(match.group(3)),
+        'uri': match.group(4),
+        'message': message,
+        'context': context
+    }
+
+
+def open_log(path):
+    """Ouvre un log actif ou une archive .gz en mode texte"""
+    path = Path(path)
+    if path.suffix == '.gz':
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def log_sort_key(path):
+    """Ordre chronologique : par jour, archives (par horodatage) avant le fichier actif"""
+    match = LOG_FILE_PATTERN.match(Path(path).name)
+    if not match:
+        return ('', float('inf'), str(path))
+    rotated_at = int(match.group(2)) if match.group(2) else float('inf')
+    return (match.group(1), rotated_at, str(path))
+
+
+def find_log_files(directory, include_archives=True):
+    """Liste les fichiers wcqs-*.log (et archives .gz) d'un dossier, triés chronologiquement"""
+    files = [
+        path for path in Path(directory).iterdir()
+        if LOG_FILE_PATTERN.match(path.name)
+        and (include_archives or path.suffix != '.gz')
+    ]
+    return sorted(files, key=log_sort_key)
+
+
+def iter_entries(paths):
+    """Itère les entrées parsées de plusieurs fichiers, ligne par ligne (mémoire bornée)"""
+    for path in paths:
+        with open_log(path) as handle:
+            for line in handle:
+                entry = parse_line(line)
+                if entry is not None:
+                    yield entry
+
+
+def expand_paths(arguments):
+    """Accepte des fichiers et/ou des dossiers de logs, retourne la liste ordonnée des fichiers"""
+    paths = []
+    for argument in arguments:
+        argument = Path(argument)
+        if argument.is_dir():
+            paths.extend(find_log_files(argument))
+        else:
+            paths.append(argument)
+    return sorted(paths, key=log_sort_key)
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stockage colonnaire des logs WCQS pour analyses répétées
+
+Convertit une fois les wcqs-*.log et archives .gz en colonnes NumPy
+partitionnées par jour ; les requêtes suivantes ne chargent que les colonnes
+utiles et filtrent/agrègent de façon vectorisée, sans re-parser le texte.
+
+Structure :
+    <store>/manifest.json                 fichiers déjà ingérés (offsets), encodage des colonnes ctx
+    <store>/dictionaries/<colonne>.json   dictionnaires globaux (codes stables)
+    <store>/date=YYYY-MM-DD/part-NNNNN.npz  un bloc par conversion et par jour
+
+Colonnes : timestamp (float64), level / uri / message (codes int32),
+user_id (int32), ctx.<clé> (float64 avec NaN, ou codes int32 avec -1 : un
+seul encodage par colonne pour tout le magasin)
+
+Usage :
+    python tools/wcqs_logstore.py convert /chemin/wcqs-logs --store ./wcqs-store
+    python tools/wcqs_logstore.py query --store ./wcqs-store --group-by uri --level ERROR
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from wcqs_logs import LOG_FILE_PATTERN, expand_paths, log_sort_key, parse_line
+
+DICTIONARY_COLUMNS = ('level', 'uri', 'message')
+
+NUMERIC = 'numeric'
+DICTIONARY = 'dictionary'
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _number_label(value):
+    """3.0 -> '3' : libellé d'une valeur numérique convertie en dictionnaire"""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _head_fingerprint(first_line):
+    """Empreinte de la première ligne : identifie une « génération » du fichier actif"""
+    return hashlib.sha1(first_line).hexdigest()[:16] if first_line else None
+
+
+def flatten_context(context, prefix='ctx.'):
+    """{"a": {"b": 1}, "c": [1, 2]} -> {"ctx.a.b": 1, "ctx.c": "[1,2]"}"""
+    flat = {}
+    if not isinstance(context, dict):
+        return flat
+    for key, value in context.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten_context(value, f'{name}.'))
+        elif isinstance(value, (list, tuple)):
+            flat[name] = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        else:
+            flat[name] = value
+    return flat
+
+
+class Dictionary:
+    """Dictionnaire valeur -> code, uniquement croissant (codes stables entre conversions)"""
+
+    def __init__(self, values=None):
+        self.values = list(values or [])
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class ChunkBuilder:
+    """Accumule les lignes d'une partition avant écriture en colonnes"""
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {'timestamp': [], 'user_id': [], 'level': [], 'uri': [], 'message': []}
+        self.context_columns = {}
+
+    def add(self, entry, store):
+        self.columns['timestamp'].append(entry['timestamp'] if entry['timestamp'] is not None else float('nan'))
+        self.columns['user_id'].append(entry['user_id'])
+        for column in DICTIONARY_COLUMNS:
+            self.columns[column].append(store.dictionary(column).encode(entry[column]))
+
+        for name, value in flatten_context(entry['context']).items():
+            values = self.context_columns.setdefault(name, [None] * self.rows)
+            values.append(value)
+        self.rows += 1
+        for values in self.context_columns.values():
+            if len(values) < self.rows:
+                values.append(None)
+
+    def context_kinds(self):
+        """Encodage qu'imposent les valeurs de ce bloc, par colonne ctx"""
+        return {
+            name: NUMERIC if all(_is_number(v) for v in values if v is not None) else DICTIONARY
+            for name, values in self.context_columns.items()
+        }
+
+    def to_arrays(self, store, kinds):
+        arrays = {
+            'timestamp': np.asarray(self.columns['timestamp'], dtype=np.float64),
+            'user_id': np.asarray(self.columns['user_id'], dtype=np.int32),
+        }
+        for column in DICTIONARY_COLUMNS:
+            arrays[column] = np.asarray(self.columns[column], dtype=np.int32)
+
+        for name, values in self.context_columns.items():
+            if kinds[name] == NUMERIC:
+                arrays[name] = np.asarray(
+                    [float('nan') if v is None else float(v) for v in values], dtype=np.float64
+                )
+            else:
+                dictionary = store.dictionary(name)
+                arrays[name] = np.asarray(
+                    [-1 if v is None else dictionary.encode(_number_label(v) if _is_number(v) else str(v))
+                     for v in values],
+                    dtype=np.int32
+                )
+        return arrays
+
+
+class LogStore:
+    """Magasin colonnaire partitionné par jour"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.dictionaries_dir = self.path / 'dictionaries'
+        self.manifest_file = self.path / 'manifest.json'
+        self._dictionaries = {}
+        self.manifest = self._read_json(self.manifest_file, {'files': {}})
+        self.manifest.setdefault('columns', {})
+
+    @staticmethod
+    def _read_json(path, default):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+
+    def _write_json(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        tmp_path.replace(path)
+
+    def _dictionary_file(self, column):
+        return self.dictionaries_dir / f'{column}.json'
+
+    def column_kind(self, column):
+        """Encodage d'une colonne ctx (magasins antérieurs : déduit des dictionnaires)"""
+        kind = self.manifest['columns'].get(column)
+        if kind is None and self._dictionary_file(column).exists():
+            kind = DICTIONARY
+        return kind
+
+    def _migrate_to_dictionary(self, column, save):
+        """Colonne numérique recevant du texte : ré-encode les blocs existants en dictionnaire"""
+        dictionary = self.dictionary(column)
+        for chunk_file in sorted(self.path.glob('date=*/part-*.npz')):
+            with np.load(chunk_file) as chunk:
+                if column not in chunk.files:
+                    continue
+                arrays = {name: chunk[name] for name in chunk.files}
+            arrays[column] = np.asarray(
+                [-1 if np.isnan(v) else dictionary.encode(_number_label(v)) for v in arrays[column]],
+                dtype=np.int32
+            )
+            tmp_path = chunk_file.with_name(f'.{chunk_file.name}.tmp.npz')
+            save(tmp_path, **arrays)
+            tmp_path.replace(chunk_file)
+
+    def _resolve_kinds(self, builders, save):
+        """Un seul encodage par colonne ctx, sur tous les blocs du magasin"""
+        wanted = {}
+        for builder in builders:
+            for name, kind in builder.context_kinds().items():
+                if wanted.get(name) != DICTIONARY:
+                    wanted[name] = kind
+
+        for name, kind in wanted.items():
+            current = self.column_kind(name)
+            if current == DICTIONARY:
+                wanted[name] = DICTIONARY
+            elif current == NUMERIC and kind == DICTIONARY:
+                self._migrate_to_dictionary(name, save)
+            self.manifest['columns'][name] = wanted[name]
+        return wanted
+
+    def dictionary(self, column):
+        if column not in self._dictionaries:
+            self._dictionaries[column] = Dictionary(self._read_json(self._dictionary_file(column), []))
+        return self._dictionaries[column]
+
+    def partitions(self, start=None, end=None):
+        """Partitions (dates) dans l'intervalle, élagage sans lire les données
+
+        Les partitions suivent la date locale du log, dont le fuseau n'est pas
+        celui de l'analyste : l'intervalle est élargi d'un jour de chaque côté
+        (décalages UTC-12 à UTC+14), le filtre exact se fait ligne à ligne.
+        """
+        if not self.path.exists():
+            return []
+        dates = sorted(
+            p.name.split('=', 1)[1] for p in self.path.iterdir()
+            if p.is_dir() and p.name.startswith('date=')
+        )
+
+        def day(timestamp, shift):
+            return (datetime.fromtimestamp(timestamp, timezone.utc) + timedelta(days=shift)).strftime('%Y-%m-%d')
+
+        start_day = day(start, -1) if start else None
+        end_day = day(end, 1) if end else None
+        return [
+            d for d in dates
+            if (start_day is None or d >= start_day) and (end_day is None or d <= end_day)
+        ]
+
+    # ------------------------------------------------------------------
+    # Conversion
+    # ------------------------------------------------------------------
+
+    def _iter_new_lines(self, path):
+        """Lignes non encore ingérées d'un fichier, avec l'offset atteint
+
+        Après une rotation WCQS_Logger, l'archive .gz reprend le contenu du
+        fichier actif, qui est tronqué puis réécrit. Chaque contenu (« génération »)
+        du fichier actif est identifié par l'empreinte de sa première ligne :
+        l'archive saute exactement ce qui a été ingéré de sa génération, quel
+        que soit l'ordre d'ingestion de l'archive et du fichier actif.
+        """
+        files = self.manifest['files']
+        name = path.name
+        match = LOG_FILE_PATTERN.match(name)
+
+        if path.suffix == '.gz':
+            if name in files:
+                return
+            active_name = f'wcqs-{match.group(1)}.log' if match else None
+            active = files.get(active_name, {}) if active_name else {}
+            consumed = 0
+            skip = None
+            with open(path, 'rb') as raw_handle, gzip.open(raw_handle) as handle:
+                for raw in handle:
+                    if skip is None:
+                        head = _head_fingerprint(raw)
+                        generations = active.setdefault('generations', {}) if active else {}
+                        if active and active.get('head') == head:
+                            # Génération courante archivée : le fichier actif repartira de zéro
+                            generations[head] = active.get('offset', 0)
+                            active.update({'offset': 0, 'size': 0, 'head': None})
+                        skip = generations.pop(head, 0)
+                    if consumed >= skip:
+                        yield raw.decode('utf-8', errors='replace')
+                    consumed += len(raw)
+            files[name] = {'offset': consumed}
+            return
+
+        record = files.get(name, {})
+        with open(path, 'rb') as handle:
+            first_line = handle.readline()
+            head = _head_fingerprint(first_line) if first_line.endswith(b'\n') else None
+            offset = record.get('offset', 0)
+            if record.get('head') not in (None, head) or path.stat().st_size < offset:
+                # Rotation : la génération précédente reste attendue par son archive .gz
+                if record.get('head'):
+                    record.setdefault('generations', {})[record['head']] = offset
+                offset = 0
+            handle.seek(offset)
+            for raw in handle:
+                if not raw.endswith(b'\n'):
+                    break
+                offset += len(raw)
+                yield raw.decode('utf-8', errors='replace')
+        files[name] = {
+            'offset': offset,
+            'size': path.stat().st_size,
+            'head': head if offset else None,
+            'generations': record.get('generations', {})
+        }
+
+    def convert(self, paths, compress=False):
+        """Ajoute les nouvelles lignes des fichiers aux partitions journalières"""
+        builders = {}
+        skipped = 0
+
+        for path in sorted(paths, key=log_sort_key):
+            match = LOG_FILE_PATTERN.match(path.name)
+            file_day = match.group(1) if match else None
+            for line in self._iter_new_lines(path):
+                entry = parse_line(line)
+                if entry is None:
+                    skipped += line.strip() != ''
+                    continue
+                day = file_day or entry['datetime'][:10]
+                builders.setdefault(day, ChunkBuilder()).add(entry, self)
+
+        save = np.savez_compressed if compress else np.savez
+        kinds = self._resolve_kinds(builders.values(), save)
+        written = {}
+        for day, builder in builders.items():
+            if not builder.rows:
+                continue
+            partition = self.path / f'date={day}'
+            partition.mkdir(parents=True, exist_ok=True)
+            index = len(list(partition.glob('part-*.npz')))
+            save(partition / f'part-{index:05d}.npz', **builder.to_arrays(self, kinds))
+            written[day] = builder.rows
+
+        # Dictionnaires puis manifeste : un arrêt brutal ne laisse jamais de codes orphelins
+        for column, dictionary in self._dictionaries.items():
+            self._write_json(self._dictionary_file(column), dictionary.values)
+        self._write_json(self.manifest_file, self.manifest)
+
+        return written, skipped
+
+    # ------------------------------------------------------------------
+    # Requêtes
+    # ------------------------------------------------------------------
+
+    def load(self, columns, start=None, end=None):
+        """Charge uniquement les colonnes demandées (+ timestamp si filtre temporel)
+
+        Retourne un dict colonne -> ndarray, colonnes absentes d'un bloc
+        complétées par NaN / -1.
+        """
+        wanted = list(dict.fromkeys(list(columns) + (['timestamp'] if start or end else [])))
+        parts = {column: [] for column in wanted}
+
+        for day in self.partitions(start, end):
+            for chunk_file in sorted((self.path / f'date={day}').glob('part-*.npz')):
+                with np.load(chunk_file) as chunk:
+                    rows = len(chunk['timestamp']) if 'timestamp' in chunk.files else None
+                    for column in wanted:
+                        if column in chunk.files:
+                            values = chunk[column]
+                            if values.dtype.kind == 'f' and self.column_kind(column) == DICTIONARY:
+                                # Bloc numérique d'un magasin antérieur au suivi des encodages
+                                dictionary = self.dictionary(column)
+                                values = np.asarray(
+                                    [-1 if np.isnan(v) else dictionary.encode(_number_label(v)) for v in values],
+                                    dtype=np.int32
+                                )
+                            parts[column].append(values)
+                        else:
+                            if rows is None:
+                                rows = len(chunk[chunk.files[0]])
+                            filler = np.full(rows, -1, dtype=np.int32) \
+                                if self._is_dictionary_column(column) else np.full(rows, np.nan)
+                            parts[column].append(filler)
+
+        data = {
+            column: np.concatenate(chunks) if chunks else np.empty(0)
+            for column, chunks in parts.items()
+        }
+
+        if (start or end) and len(data['timestamp']):
+            mask = np.ones(len(data['timestamp']), dtype=bool)
+            if start:
+                mask &= data['timestamp'] >= start
+            if end:
+                mask &= data['timestamp'] <= end
+            data = {column: values[mask] for column, values in data.items()}
+
+        return data
+
+    def _is_dictionary_column(self, column):
+        return column in DICTIONARY_COLUMNS or self.column_kind(column) == DICTIONARY
+
+    def decode(self, column, codes):
+        """Codes -> valeurs d'origine pour une colonne dictionnaire"""
+        values = self.dictionary(column).values
+        return [values[code] if code >= 0 else None for code in codes]
+
+    def group_count(self, column, where=None, start=None, end=None):
+        """Comptage vectorisé par valeur d'une colonne (filtre where : {colonne: valeur})"""
+        where = where or {}
+        data = self.load([column, *where.keys()], start, end)
+
+        mask = np.ones(len(data[column]), dtype=bool)
+        for filter_column, value in where.items():
+            if self._is_dictionary_column(filter_column):
+                code = self.dictionary(filter_column).codes.get(value, -2)
+                mask &= data[filter_column] == code
+            else:
+                mask &= data[filter_column] == float(value)
+
+        values, counts = np.unique(data[column][mask], return_counts=True)
+        order = np.argsort(counts)[::-1]
+        values, counts = values[order], counts[order]
+
+        if self._is_dictionary_column(column):
+            labels = self.decode(column, values.astype(np.int64))
+        else:
+            labels = values.tolist()
+        return list(zip(labels, counts.tolist()))
+
+
+def _parse_time(value):
+    if value is None:
+        return None
+    return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    if np is None:
+        print("❌ NumPy requis : pip install numpy")
+        return 1
+
+    parser = argparse.ArgumentParser(description="Stockage colonnaire des logs WCQS")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help="Ingérer de nouveaux logs")
+    convert_parser.add_argument('paths', nargs='+', help="Fichiers wcqs-*.log[.gz] ou dossier wcqs-logs")
+    convert_parser.add_argument('--store', required=True)
+    convert_parser.add_argument('--compress', action='store_true', help="Blocs .npz compressés")
+
+    query_parser = subparsers.add_parser('query', help="Comptage par valeur d'une colonne")
+    query_parser.add_argument('--store', required=True)
+    query_parser.add_argument('--group-by', default='level',
+                              help="Colonne : level, uri, message, user_id ou ctx.<clé>")
+    query_parser.add_argument('--level', help="Filtrer sur un niveau (ex. ERROR)")
+    query_parser.add_argument('--user', type=int, help="Filtrer sur un user_id")
+    query_parser.add_argument('--since', help="Début ISO 8601 (ex. 2025-09-26T08:00:00+02:00)")
+    query_parser.add_argument('--until', help="Fin ISO 8601")
+    query_parser.add_argument('--limit', type=int, default=20)
+
+    args = parser.parse_args()
+    store = LogStore(args.store)
+
+    if args.command == 'convert':
+        started = datetime.now()
+        written, skipped = store.convert(expand_paths(args.paths), compress=args.compress)
+        duration = (datetime.now() - started).total_seconds()
+        for day, rows in sorted(written.items()):
+            print(f"   date={day}: +{rows} lignes")
+        print(f"✅ {sum(written.values())} lignes ajoutées en {duration:.2f}s"
+              f"{f' ({skipped} lignes hors format ignorées)' if skipped else ''}")
+        return 0
+
+    where = {}
+    if args.level:
+        where['level'] = args.level.upper()
+    if args.user is not None:
+        where['user_id'] = args.user
+
+    started = datetime.now()
+    results = store.group_count(args.group_by, where, _parse_time(args.since), _parse_time(args.until))
+    duration = (datetime.now() - started).total_seconds()
+
+    print(f"{'Nombre':>10}  {args.group_by}")
+    for label, count in results[:args.limit]:
+        print(f"{count:>10}  {label}")
+    print(f"\n{len(results)} valeur(s) distincte(s) • {duration:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
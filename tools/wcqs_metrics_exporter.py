@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exporteur de métriques WCQS (format texte OpenMetrics)
+
+Suit le log WCQS_Logger actif de façon incrémentale à partir d'un offset
+sauvegardé, agrège les événements en mémoire (compteurs + histogrammes) et
+réécrit atomiquement un fichier .prom pour le textfile collector de
+node_exporter. Les compteurs sont sauvegardés avec l'offset : ils restent
+monotones entre redémarrages et entre passages --once.
+
+Usage :
+    python tools/wcqs_metrics_exporter.py --log-dir /chemin/uploads/wcqs-logs \
+        --output /var/lib/node_exporter/textfile/wcqs.prom
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+from wcqs_logs import LEVELS, find_log_files, log_sort_key, parse_line
+
+# Bornes des histogrammes
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PENDING_TESTS_BUCKETS = (1, 2, 3, 5, 10)
+
+# Erreurs de lecture transitoires : .gz en cours d'écriture, fichier supprimé entre stat et open
+READ_ERRORS = (OSError, EOFError, zlib.error)
+
+# Passages en échec avant d'abandonner une archive illisible
+ARCHIVE_MAX_FAILURES = 3
+
+# Message de WCQS_Token::reject, raison dans le contexte.
+# WCQS_Token::verify n'est encore appelé par aucun chemin de production
+# (CheckoutDecision accepte tp_token sans le vérifier) : la série reste
+# vide tant que la vérification n'est pas branchée au checkout.
+TOKEN_FAILURE_MESSAGE = 'WCQS_Token: Verification failed'
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes (coût constant par observation)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def render(self, name, labels=''):
+        lines = []
+        cumulative = 0
+        separator = ',' if labels else ''
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{separator}le="+Inf"}} {self.count}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_count{suffix} {self.count}')
+        lines.append(f'{name}_sum{suffix} {self.sum}')
+        return lines
+
+    def to_state(self):
+        return {'buckets': list(self.buckets), 'counts': self.counts, 'count': self.count, 'sum': self.sum}
+
+    @classmethod
+    def from_state(cls, buckets, state):
+        """Histogramme restauré ; bornes modifiées depuis la sauvegarde : repart de zéro"""
+        histogram = cls(buckets)
+        if state and tuple(state.get('buckets', ())) == tuple(buckets):
+            histogram.counts = list(state['counts'])
+            histogram.count = state['count']
+            histogram.sum = state['sum']
+        return histogram
+
+
+class WCQSMetrics:
+    """Agrégation en mémoire des événements WCQS"""
+
+    def __init__(self):
+        self.lines_by_level = {level: 0 for level in LEVELS}
+        self.checkout_decisions = {'blocked': 0, 'allowed': 0}
+        self.test_redirects = 0
+        self.token_failures = {}
+        self.unparsed_lines = 0
+        self.pending_tests = Histogram(PENDING_TESTS_BUCKETS)
+        self.durations = {}
+        self.last_event_timestamp = 0.0
+        self._last_request_key = None
+
+    def observe_line(self, line):
+        entry = parse_line(line)
+        if entry is None:
+            if line.strip():
+                self.unparsed_lines += 1
+            return
+
+        level = entry['level'] if entry['level'] in self.lines_by_level else 'INFO'
+        self.lines_by_level[level] += 1
+        if entry['timestamp']:
+            self.last_event_timestamp = max(self.last_event_timestamp, entry['timestamp'])
+
+        message = entry['message']
+        context = entry['context'] if isinstance(entry['context'], dict) else {}
+
+        # Cart_Guard::should_block_checkout
+        if message == 'Cart_Guard: Blocking checkout':
+            self.checkout_decisions['blocked'] += 1
+            if isinstance(context.get('pending_tests'), (int, float)):
+                self.pending_tests.observe(context['pending_tests'])
+        elif message == 'Cart_Guard: Allowing checkout':
+            self.checkout_decisions['allowed'] += 1
+
+        # Arrivée sur la page de test : URL construite par Cart_Guard::get_test_url
+        # (une requête = lignes consécutives avec même utilisateur, URI et seconde)
+        request_key = (entry['user_id'], entry['uri'], entry['datetime'])
+        if request_key != self._last_request_key:
+            self._last_request_key = request_key
+            if 'wcqs_product_id=' in entry['uri']:
+                self.test_redirects += 1
+
+        # WCQS_Token::verify journalise chaque refus avec sa raison
+        if message == TOKEN_FAILURE_MESSAGE:
+            reason = str(context.get('reason', 'unknown'))
+            self.token_failures[reason] = self.token_failures.get(reason, 0) + 1
+
+        # Durées présentes dans le contexte JSON (duration, elapsed, *_ms)
+        for key, value in context.items():
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            if key.endswith('_ms'):
+                seconds = value / 1000.0
+            elif key in ('duration', 'elapsed', 'duration_s'):
+                seconds = float(value)
+            else:
+                continue
+            histogram = self.durations.setdefault(key, Histogram(DURATION_BUCKETS))
+            histogram.observe(seconds)
+
+    def render(self):
+        """Sérialise les métriques au format texte OpenMetrics"""
+        lines = [
+            '# TYPE wcqs_log_lines counter',
+            '# HELP wcqs_log_lines Lignes WCQS_Logger par niveau.'
+        ]
+        for level, count in self.lines_by_level.items():
+            lines.append(f'wcqs_log_lines_total{{level="{level}"}} {count}')
+
+        lines += [
+            '# TYPE wcqs_checkout_decisions counter',
+            '# HELP wcqs_checkout_decisions Décisions Cart_Guard (checkout bloqué ou autorisé).'
+        ]
+        for decision, count in self.checkout_decisions.items():
+            lines.append(f'wcqs_checkout_decisions_total{{decision="{decision}"}} {count}')
+
+        lines += [
+            '# TYPE wcqs_test_redirects counter',
+            '# HELP wcqs_test_redirects Requêtes arrivant sur une page de test (wcqs_product_id).',
+            f'wcqs_test_redirects_total {self.test_redirects}',
+            '# TYPE wcqs_token_failures counter',
+            '# HELP wcqs_token_failures Jetons refusés par WCQS_Token::verify, par raison '
+            '(aucun appel en production tant que tp_token n\'est pas vérifié au checkout).'
+        ]
+        for reason, count in sorted(self.token_failures.items()):
+            lines.append(f'wcqs_token_failures_total{{reason="{reason}"}} {count}')
+
+        lines += [
+            '# TYPE wcqs_unparsed_lines counter',
+            '# HELP wcqs_unparsed_lines Lignes ne respectant pas le format WCQS_Logger.',
+            f'wcqs_unparsed_lines_total {self.unparsed_lines}',
+            '# TYPE wcqs_blocked_pending_tests histogram',
+            '# HELP wcqs_blocked_pending_tests Tests en attente lors d\'un checkout bloqué.'
+        ]
+        lines += self.pending_tests.render('wcqs_blocked_pending_tests')
+
+        if self.durations:
+            lines += [
+                '# TYPE wcqs_context_duration_seconds histogram',
+                '# HELP wcqs_context_duration_seconds Durées remontées dans le contexte des logs.'
+            ]
+            for key, histogram in sorted(self.durations.items()):
+                lines += histogram.render('wcqs_context_duration_seconds', f'key="{key}"')
+
+        lines += [
+            '# TYPE wcqs_last_event_timestamp_seconds gauge',
+            f'wcqs_last_event_timestamp_seconds {self.last_event_timestamp}',
+            '# EOF'
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def to_state(self):
+        """État sérialisable, sauvegardé avec l'offset du LogTailer"""
+        return {
+            'lines_by_level': self.lines_by_level,
+            'checkout_decisions': self.checkout_decisions,
+            'test_redirects': self.test_redirects,
+            'token_failures': self.token_failures,
+            'unparsed_lines': self.unparsed_lines,
+            'pending_tests': self.pending_tests.to_state(),
+            'durations': {key: histogram.to_state() for key, histogram in self.durations.items()},
+            'last_event_timestamp': self.last_event_timestamp,
+            'last_request_key': self._last_request_key
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        metrics = cls()
+        if not state:
+            return metrics
+        metrics.lines_by_level.update(state.get('lines_by_level', {}))
+        metrics.checkout_decisions.update(state.get('checkout_decisions', {}))
+        metrics.test_redirects = state.get('test_redirects', 0)
+        metrics.token_failures = dict(state.get('token_failures', {}))
+        metrics.unparsed_lines = state.get('unparsed_lines', 0)
+        metrics.pending_tests = Histogram.from_state(PENDING_TESTS_BUCKETS, state.get('pending_tests'))
+        metrics.durations = {
+            key: Histogram.from_state(DURATION_BUCKETS, histogram)
+            for key, histogram in state.get('durations', {}).items()
+        }
+        metrics.last_event_timestamp = state.get('last_event_timestamp', 0.0)
+        key = state.get('last_request_key')
+        metrics._last_request_key = tuple(key) if key else None
+        return metrics
+
+
+class LogTailer:
+    """Lecture incrémentale du log actif, offset persistant et gestion de rotation
+
+    - Rotation WCQS_Logger : le fichier est archivé en .gz puis tronqué ; toutes
+      les archives apparues depuis le dernier passage sont relues dans l'ordre,
+      la première à partir de l'offset sauvegardé.
+    - Changement de jour : l'ancien fichier (et ses rotations) est lu jusqu'au
+      bout avant de passer au nouveau wcqs-YYYY-MM-DD.log.
+    - L'état n'est mis à jour qu'en fin de passage : si poll() lève une erreur
+      de lecture, l'offset reste celui du dernier passage réussi.
+    """
+
+    def __init__(self, log_dir, state_file):
+        self.log_dir = Path(log_dir)
+        self.state_file = Path(state_file)
+        self.state = self._load_state()
+        self._archive_failures = {}
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self):
+        _atomic_write(self.state_file, json.dumps(self.state))
+
+    def _active_file(self):
+        candidates = find_log_files(self.log_dir, include_archives=False)
+        return candidates[-1] if candidates else None
+
+    def _read_from(self, path, offset, callback):
+        """Lit les lignes complètes à partir de l'offset, retourne le nouvel offset"""
+        with open(path, 'rb') as handle:
+            handle.seek(offset)
+            for raw in handle:
+                if not raw.endswith(b'\n'):
+                    break  # ligne en cours d'écriture
+                offset += len(raw)
+                callback(raw.decode('utf-8', errors='replace'))
+        return offset
+
+    def _archives(self, path):
+        """Archives .gz de path, dans l'ordre de rotation"""
+        return sorted(self.log_dir.glob(path.name + '.*.gz'), key=log_sort_key)
+
+    def _drain_archive(self, archive, offset, callback):
+        """Relit depuis l'archive .gz la partie écrite avant la troncature"""
+        consumed = 0
+        with open(archive, 'rb') as raw_handle, gzip.open(raw_handle) as handle:
+            for raw in handle:
+                if consumed >= offset:
+                    callback(raw.decode('utf-8', errors='replace'))
+                consumed += len(raw)
+
+    def _catch_up(self, archives, seen, offset, callback):
+        """Relit les archives postérieures à `seen` ; retourne l'offset à reprendre dans le fichier
+
+        Une archive encore illisible (gzip tronqué) fait échouer le passage pour
+        être réessayée ; après ARCHIVE_MAX_FAILURES échecs elle est abandonnée.
+        """
+        if seen is not None:
+            seen_key = log_sort_key(self.log_dir / seen)
+            archives = [archive for archive in archives if log_sort_key(archive) > seen_key]
+
+        for archive in archives:
+            try:
+                self._drain_archive(archive, offset, callback)
+            except READ_ERRORS as error:
+                failures = self._archive_failures.get(archive.name, 0) + 1
+                self._archive_failures[archive.name] = failures
+                if failures < ARCHIVE_MAX_FAILURES:
+                    raise
+                print(f"⚠️  Archive ignorée après {failures} échecs : {archive.name} ({error})",
+                      file=sys.stderr)
+            self._archive_failures.pop(archive.name, None)
+            offset = 0
+        return offset
+
+    def poll(self, callback):
+        """Consomme les nouvelles lignes ; coût proportionnel aux seules nouvelles données"""
+        active = self._active_file()
+        if active is None:
+            return
+
+        current = self.state.get('file')
+        offset = self.state.get('offset', 0)
+        seen = self.state.get('archive')
+
+        if current and current != str(active):
+            # Nouveau jour : terminer l'ancien fichier, rotations comprises
+            previous = Path(current)
+            offset = self._catch_up(self._archives(previous), seen, offset, callback)
+            if previous.exists() and previous.stat().st_ino == self.state.get('inode'):
+                self._read_from(previous, offset, callback)
+
+        # Archives listées avant la lecture : une rotation pendant la lecture
+        # sera vue (et relue depuis l'offset) au passage suivant
+        archives = self._archives(active)
+        stat = active.stat()
+
+        if current != str(active):
+            # Fichier jamais suivi : ses rotations éventuelles sont antérieures au
+            # premier passage, ou datent du jour commencé depuis le précédent
+            offset = self._catch_up(archives, None, 0, callback) if current else 0
+        elif stat.st_ino != self.state.get('inode'):
+            offset = 0
+        else:
+            offset = self._catch_up(archives, seen, offset, callback)
+            if stat.st_size < offset:
+                # Troncature sans archive (WCQS_Logger::clear_logs)
+                offset = 0
+
+        offset = self._read_from(active, offset, callback)
+        self.state = {
+            'file': str(active),
+            'inode': stat.st_ino,
+            'offset': offset,
+            'archive': archives[-1].name if archives else None
+        }
+
+
+def _atomic_write(path, content):
+    """Écriture atomique : fichier temporaire dans le même dossier puis os.replace"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{path.name}.', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporteur OpenMetrics des logs WCQS")
+    parser.add_argument('--log-dir', required=True, help="Dossier wcqs-logs (uploads/wcqs-logs)")
+    parser.add_argument('--output', required=True, help="Fichier .prom à écrire")
+    parser.add_argument('--state', default=None, help="Fichier d'état (offset + compteurs), défaut : <output>.state.json")
+    parser.add_argument('--interval', type=float, default=5.0, help="Période d'écriture en secondes")
+    parser.add_argument('--once', action='store_true', help="Un seul passage puis sortie")
+    args = parser.parse_args()
+
+    state_file = args.state or f'{args.output}.state.json'
+    tailer = LogTailer(args.log_dir, state_file)
+    # Compteurs repris de l'état : pas de remise à zéro vue par Prometheus
+    metrics = WCQSMetrics.from_state(tailer.state.get('metrics'))
+
+    print(f"📈 Export des métriques WCQS vers {args.output} (toutes les {args.interval}s)")
+
+    try:
+        while True:
+            try:
+                tailer.poll(metrics.observe_line)
+            except READ_ERRORS as error:
+                # Passage abandonné : offset inchangé, compteurs ramenés au
+                # dernier état sauvegardé pour ne pas compter deux fois
+                print(f"⚠️  Lecture interrompue, nouvel essai au prochain passage : {error}",
+                      file=sys.stderr)
+                metrics = WCQSMetrics.from_state(tailer.state.get('metrics'))
+            _atomic_write(args.output, metrics.render())
+            tailer.state['metrics'] = metrics.to_state()
+            tailer.save_state()
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n👋 Arrêt de l'exporteur")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rejeu de trafic réel WCQS contre une pile locale
+
+Extrait des logs WCQS_Logger les requêtes ([USER:id] [URI] + horodatage),
+puis les rejoue contre un WordPress local (ou un serveur HTTP de substitution)
+à vitesse 1×, 10× ou au plus vite, en conservant l'ordre et les cookies de
+chaque utilisateur. Rapporte les percentiles de latence par classe d'URI et,
+avec --wp-path, compare au rejeu avec Cart_Guard désactivé (flag enforce_cart).
+
+Usage :
+    python tools/wcqs_replay.py /chemin/wcqs-logs --target http://127.0.0.1:8080 \
+        --speed 10 --wp-path /chemin/site-local
+"""
+
+import argparse
+import heapq
+import http.cookiejar
+import json
+import queue
+import re
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from wcqs_logs import expand_paths, iter_entries
+
+URI_CLASSES = (
+    ('store_api_checkout', re.compile(r'/wc/store(?:/v\d+)?/checkout')),
+    ('store_api', re.compile(r'/wc/store/')),
+    ('test_page', re.compile(r'[?&]wcqs_product_id=\d+')),
+    ('cart', re.compile(r'^/(?:panier|cart)/')),
+    ('checkout', re.compile(r'^/(?:commander|checkout)/')),
+)
+
+# Requêtes non rejouables ou hors périmètre frontend
+SKIPPED_URI = re.compile(r'^(?:CLI$|/wp-admin/|/wp-login\.php|/wp-cron\.php|/xmlrpc\.php)')
+
+LOCAL_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+# Inactivité (s) après laquelle un visiteur anonyme n'est plus réutilisé (comme wcqs_journeys.py)
+ANONYMOUS_GAP = 1800
+
+
+def classify_uri(uri):
+    for name, pattern in URI_CLASSES:
+        if pattern.search(uri):
+            return name
+    return 'other'
+
+
+def extract_traces(entries, anonymous_gap=ANONYMOUS_GAP):
+    """Regroupe les lignes de log en requêtes, puis en traces par visiteur
+
+    Une requête = lignes d'un même visiteur avec même URI et même seconde
+    (dédoublonnées par visiteur, même entrelacées avec d'autres requêtes).
+    Retourne {visiteur: [(timestamp, uri), ...]} avec 'user-<id>' pour un
+    utilisateur connecté et 'anon-<n>' pour un visiteur anonyme.
+
+    Les logs ne contiennent ni IP ni cookie : les requêtes anonymes (USER:0)
+    sont réparties entre visiteurs anonymes. Chaque requête va au visiteur
+    libre (aucune requête dans la même seconde) actif le plus récemment, à
+    moins de anonymous_gap ; un nouveau visiteur n'est créé que si tous sont
+    occupés. Le nombre de visiteurs (et de cookies) suit ainsi la concurrence
+    anonyme observée au lieu d'un visiteur par ligne.
+    """
+    traces = {}
+    last_keys = {}
+    anonymous_requests = {}  # (uri, datetime) -> visiteur, pour la seconde en cours
+    anonymous_seen = {}      # visiteur anonyme -> horodatage de sa dernière requête
+    anonymous = 0
+    for entry in entries:
+        timestamp = entry['timestamp']
+        if timestamp is None or SKIPPED_URI.match(entry['uri']):
+            continue
+        key = (entry['uri'], entry['datetime'])
+
+        if entry['user_id'] != 0:
+            visitor = f"user-{entry['user_id']}"
+            if last_keys.get(visitor) == key:
+                continue
+            last_keys[visitor] = key
+        else:
+            if key in anonymous_requests:
+                continue
+            # Les requêtes des secondes précédentes ne peuvent plus recevoir de lignes
+            anonymous_requests = {
+                request: owner for request, owner in anonymous_requests.items()
+                if request[1] == entry['datetime']
+            }
+            visitor = _free_anonymous_visitor(anonymous_seen, timestamp, anonymous_gap)
+            if visitor is None:
+                visitor = f'anon-{anonymous}'
+                anonymous += 1
+            anonymous_seen[visitor] = timestamp
+            anonymous_requests[key] = visitor
+        traces.setdefault(visitor, []).append((timestamp, entry['uri']))
+
+    for requests in traces.values():
+        requests.sort(key=lambda request: request[0])
+    return traces
+
+
+def _free_anonymous_visitor(anonymous_seen, timestamp, gap):
+    """Visiteur anonyme libre le plus récemment actif, None si tous sont occupés"""
+    best = None
+    for visitor, seen in list(anonymous_seen.items()):
+        if timestamp - seen > gap:
+            del anonymous_seen[visitor]  # parti : ne sera plus réutilisé
+        elif seen < timestamp and (best is None or seen > anonymous_seen[best]):
+            best = visitor
+    return best
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Mesure la réponse elle-même (ex. redirection Cart_Guard vers la page de test)"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))]
+
+
+class TrafficReplayer:
+    """Rejeu ordonné par utilisateur avec horloge accélérée"""
+
+    def __init__(self, target, speed=1.0, workers=32, timeout=30):
+        self.target = target.rstrip('/')
+        self.speed = speed  # None : au plus vite
+        self.workers = workers
+        self.timeout = timeout
+
+    def _send(self, opener, uri):
+        url = self.target + uri
+        # La Store API checkout est un POST ; les autres requêtes loguées sont des GET
+        data = b'{}' if classify_uri(uri) == 'store_api_checkout' else None
+        request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'} if data else {})
+
+        start = time.perf_counter()
+        try:
+            with opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            error.read()
+            status = error.code
+        except (urllib.error.URLError, OSError):
+            status = None
+        return time.perf_counter() - start, status
+
+    def replay(self, traces):
+        """Rejoue toutes les traces, retourne la liste des résultats par requête"""
+        openers = {
+            visitor: urllib.request.build_opener(
+                urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect
+            )
+            for visitor in traces
+        }
+
+        origin = min((requests[0][0] for requests in traces.values() if requests), default=0)
+        clock_start = time.monotonic()
+
+        def due_time(timestamp):
+            if self.speed is None:
+                return 0.0
+            return clock_start + (timestamp - origin) / self.speed
+
+        # Tas des prochaines requêtes (une seule en attente par visiteur)
+        heap = [(due_time(requests[0][0]), visitor, 0) for visitor, requests in traces.items() if requests]
+        heapq.heapify(heap)
+        completions = queue.Queue()
+        in_flight = 0
+        results = []
+
+        def run(visitor, index):
+            timestamp, uri = traces[visitor][index]
+            latency, status = self._send(openers[visitor], uri)
+            completions.put((visitor, index, uri, latency, status))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while heap or in_flight:
+                timeout = None
+                if heap:
+                    timeout = max(0.0, heap[0][0] - time.monotonic())
+                    if timeout == 0.0 and in_flight < self.workers:
+                        _, visitor, index = heapq.heappop(heap)
+                        executor.submit(run, visitor, index)
+                        in_flight += 1
+                        continue
+                    if in_flight >= self.workers:
+                        timeout = None
+
+                try:
+                    visitor, index, uri, latency, status = completions.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+
+                in_flight -= 1
+                results.append({'visitor': visitor, 'uri': uri, 'class': classify_uri(uri),
+                                'latency': latency, 'status': status})
+
+                # Ordre par visiteur : la requête suivante part après la précédente
+                if index + 1 < len(traces[visitor]):
+                    next_due = max(due_time(traces[visitor][index + 1][0]), time.monotonic())
+                    heapq.heappush(heap, (next_due, visitor, index + 1))
+
+        return results, time.monotonic() - clock_start
+
+
+def summarize(results):
+    classes = {}
+    for result in results:
+        classes.setdefault(result['class'], []).append(result)
+
+    summary = {}
+    for name, items in sorted(classes.items()):
+        latencies = [item['latency'] * 1000 for item in items if item['status'] is not None]
+        summary[name] = {
+            'requests': len(items),
+            'errors': sum(1 for item in items if item['status'] is None or item['status'] >= 500),
+            'p50_ms': percentile(latencies, 50),
+            'p90_ms': percentile(latencies, 90),
+            'p99_ms': percentile(latencies, 99)
+        }
+    return summary
+
+
+def _wp(wp_cli, wp_path, *args):
+    result = subprocess.run(
+        [wp_cli, *args, f'--path={wp_path}'],
+        capture_output=True, text=True, encoding='utf-8', errors='replace'
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return result.stdout.strip()
+
+
+def display(runs):
+    def fmt(value):
+        return f'{value:.1f}' if value is not None else '-'
+
+    print("\n" + "=" * 90)
+    print("⏱️  LATENCES PAR CLASSE D'URI (ms)")
+    print("=" * 90)
+    names = list(runs)
+    print(f"{'Classe':<20}{'Requêtes':>10}{'Erreurs':>9}" +
+          ''.join(f"{f'{n} p50':>14}{f'{n} p99':>14}" for n in names))
+    classes = sorted({c for summary in runs.values() for c in summary['classes']})
+    for name in classes:
+        first = next(summary['classes'][name] for summary in runs.values() if name in summary['classes'])
+        line = f"{name:<20}{first['requests']:>10}{first['errors']:>9}"
+        for run_name in names:
+            stats = runs[run_name]['classes'].get(name, {})
+            line += f"{fmt(stats.get('p50_ms')):>14}{fmt(stats.get('p99_ms')):>14}"
+        print(line)
+
+    if 'enforced' in runs and 'baseline' in runs:
+        print("\nSurcoût Cart_Guard (p50 enforced - baseline) :")
+        for name in classes:
+            enforced = runs['enforced']['classes'].get(name, {}).get('p50_ms')
+            baseline = runs['baseline']['classes'].get(name, {}).get('p50_ms')
+            if enforced is not None and baseline is not None:
+                print(f"   {name:<20}{enforced - baseline:+.1f} ms")
+    print("=" * 90)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejeu de trafic WCQS depuis les logs")
+    parser.add_argument('paths', nargs='+', help="Fichiers wcqs-*.log[.gz] ou dossier wcqs-logs")
+    parser.add_argument('--target', required=True, help="URL de la pile locale (ex. http://127.0.0.1:8080)")
+    parser.add_argument('--speed', default='1', help="Facteur d'accélération (1, 10...) ou 'max'")
+    parser.add_argument('--workers', type=int, default=32, help="Requêtes simultanées maximum")
+    parser.add_argument('--wp-path', help="Chemin WordPress local : active la comparaison enforce_cart on/off")
+    parser.add_argument('--wp-cli', default='wp')
+    parser.add_argument('--allow-remote', action='store_true', help="Autoriser une cible non locale")
+    parser.add_argument('--json', help="Écrire le rapport JSON dans ce fichier")
+    args = parser.parse_args()
+
+    if urlsplit(args.target).hostname not in LOCAL_HOSTS and not args.allow_remote:
+        print("❌ Cible non locale refusée (utiliser --allow-remote en connaissance de cause)")
+        return 1
+
+    speed = None if args.speed == 'max' else float(args.speed)
+    traces = extract_traces(iter_entries(expand_paths(args.paths)))
+    total = sum(len(requests) for requests in traces.values())
+    anonymous = sum(1 for visitor in traces if visitor.startswith('anon-'))
+    print(f"🎬 {total} requêtes de {len(traces) - anonymous} utilisateurs connectés "
+          f"+ {anonymous} visiteurs anonymes • vitesse "
+          f"{'max' if speed is None else f'{speed:g}×'} • cible {args.target}")
+
+    replayer = TrafficReplayer(args.target, speed=speed, workers=args.workers)
+    modes = [('enforced', '1'), ('baseline', '0')] if args.wp_path else [('replay', None)]
+    runs = {}
+
+    original_flags = _wp(args.wp_cli, args.wp_path, 'option', 'get', 'wcqs_flags', '--format=json') \
+        if args.wp_path else None
+    try:
+        for name, enforce in modes:
+            if enforce is not None:
+                _wp(args.wp_cli, args.wp_path, 'option', 'patch', 'update', 'wcqs_flags', 'enforce_cart', enforce)
+            print(f"▶️  Rejeu '{name}'...")
+            results, duration = replayer.replay(traces)
+            runs[name] = {'duration': duration, 'classes': summarize(results)}
+            print(f"   terminé en {duration:.1f}s")
+    finally:
+        if original_flags:
+            _wp(args.wp_cli, args.wp_path, 'option', 'update', 'wcqs_flags', original_flags, '--format=json')
+
+    display(runs)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(runs, f, indent=2, ensure_ascii=False)
+        print(f"Rapport JSON: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Mode watch pour les tests WC Qualiopi Steps
+Surveille src/, tests/, phpunit.xml et composer.json (inotify natif, polling
+en secours) et relance uniquement les fichiers de tests concernés par les
+modifications
+"""
+
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import struct
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Constantes inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+# Fichiers dont la modification impose de relancer toute la suite
+GLOBAL_FILES = {'bootstrap.php', 'TestCase.php', 'WordPressStandIn.php', 'Pest.php', 'phpunit.xml', 'composer.json'}
+
+# Fichiers globaux situés à la racine du plugin, surveillés hors de src/ et tests/
+ROOT_FILES = ('phpunit.xml', 'composer.json')
+
+
+class InotifyWatcher:
+    """Surveillance récursive via inotify (Linux), sans dépendance externe
+
+    `files` : fichiers isolés surveillés via leur dossier parent (non récursif),
+    les autres entrées de ce dossier étant ignorées.
+    """
+
+    def __init__(self, roots, files=()):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("libc introuvable")
+
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError("inotify non disponible")
+
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 a échoué")
+
+        self.watches = {}
+        for root in roots:
+            for directory, _, _ in os.walk(root):
+                self._add_watch(Path(directory))
+
+        self.files = {Path(path) for path in files}
+        recursive = set(self.watches.values())
+        self.file_only = set()
+        for directory in {path.parent for path in self.files} - recursive:
+            wd = self._add_watch(directory)
+            if wd is not None:
+                self.file_only.add(wd)
+
+    def _add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            return None
+        self.watches[wd] = directory
+        return wd
+
+    def wait(self, timeout=None):
+        """Attend des événements et retourne l'ensemble des chemins modifiés"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buffer):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = buffer[offset:offset + name_len].rstrip(b'\0')
+            offset += name_len
+
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+
+            path = directory / os.fsdecode(name)
+            if wd in self.file_only:
+                if path in self.files and not mask & IN_ISDIR:
+                    changed.add(path)
+                continue
+            if mask & IN_ISDIR:
+                if mask & IN_CREATE:
+                    self._add_watch(path)
+                continue
+            changed.add(path)
+
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Surveillance par comparaison périodique des mtime (toutes plateformes)"""
+
+    def __init__(self, roots, files=(), interval=0.25):
+        self.roots = [Path(root) for root in roots]
+        self.files = [Path(path) for path in files]
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for root in self.roots:
+            for directory, _, files in os.walk(root):
+                for name in files:
+                    path = Path(directory) / name
+                    try:
+                        snapshot[path] = path.stat().st_mtime_ns
+                    except OSError:
+                        continue
+        for path in self.files:
+            try:
+                snapshot[path] = path.stat().st_mtime_ns
+            except OSError:
+                continue
+        return snapshot
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {
+                path for path in current.keys() | self.snapshot.keys()
+                if current.get(path) != self.snapshot.get(path)
+            }
+            self.snapshot = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval if deadline is None else min(self.interval, max(0, deadline - time.monotonic())))
+
+    def close(self):
+        pass
+
+
+def create_watcher(roots, files=()):
+    """inotify si disponible, polling sinon"""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(roots, files)
+        except OSError:
+            pass
+    return PollingWatcher(roots, files)
+
+
+class TestWatcher:
+    """Relance incrémentale des tests Pest concernés par chaque sauvegarde"""
+
+    def __init__(self, plugin_dir, php_binary="php", debounce=0.15):
+        self.plugin_dir = Path(plugin_dir)
+        self.src_dir = self.plugin_dir / "src"
+        self.tests_dir = self.plugin_dir / "tests"
+        self.php_binary = php_binary
+        self.debounce = debounce
+        self._test_index = {}
+
+    def _test_files(self):
+        return sorted(
+            path for suite in ('Unit', 'Integration')
+            for path in (self.tests_dir / suite).rglob('*Test.php')
+        )
+
+    def _index_test(self, test_file):
+        """Mémorise les identifiants (classes) référencés par un fichier de test"""
+        try:
+            content = test_file.read_text(encoding='utf-8', errors='replace')
+        except OSError:
+            self._test_index.pop(test_file, None)
+            return
+        self._test_index[test_file] = set(re.findall(r'\b[A-Za-z_][A-Za-z0-9_]*\b', content))
+
+    def build_index(self):
+        self._test_index = {}
+        for test_file in self._test_files():
+            self._index_test(test_file)
+
+    def affected_tests(self, changed):
+        """Associe les fichiers modifiés aux fichiers de tests à relancer
+
+        Retourne None si toute la suite doit être relancée : fichier global
+        modifié, ou fichier PHP auquel aucun test n'est associé (signalé).
+        """
+        targets = set()
+
+        for path in changed:
+            path = Path(path)
+            if path.name in GLOBAL_FILES:
+                return None
+
+            if path.suffix != '.php':
+                continue
+
+            if path.name.endswith('Test.php') and self.tests_dir in path.parents:
+                self._index_test(path)
+                if path.exists():
+                    targets.add(path)
+                continue
+
+            if self.src_dir in path.parents:
+                # src/Core/CheckoutDecision.php -> tests référençant CheckoutDecision
+                class_name = path.stem
+                mapped = {
+                    test_file for test_file, identifiers in self._test_index.items()
+                    if class_name in identifiers
+                }
+                if mapped:
+                    targets.update(mapped)
+                    continue
+
+            # Helper de tests, src/ sans test associé... : ne pas ignorer la modification
+            print(f"   Aucun test associé à {self._relative(path)} : relance de la suite complète")
+            return None
+
+        return targets
+
+    def _relative(self, path):
+        try:
+            return path.relative_to(self.plugin_dir)
+        except ValueError:
+            return path
+
+    def run_targets(self, targets):
+        """Lance Pest sur les fichiers ciblés et affiche un résumé compact"""
+        cmd = [self.php_binary, str(Path('vendor') / 'bin' / 'pest'), '--colors=never']
+        if targets is not None:
+            cmd += [str(path.relative_to(self.plugin_dir)) for path in sorted(targets)]
+
+        start = time.monotonic()
+        result = subprocess.run(
+            cmd,
+            cwd=self.plugin_dir,
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace'
+        )
+        duration = time.monotonic() - start
+
+        passed = re.search(r'(\d+)\s+passed', result.stdout)
+        failed = re.search(r'(\d+)\s+failed', result.stdout)
+        passed = int(passed.group(1)) if passed else 0
+        failed = int(failed.group(1)) if failed else 0
+
+        scope = "suite complète" if targets is None else f"{len(targets)} fichier(s)"
+        icon = "✅" if result.returncode == 0 else "❌"
+        print(f"[{time.strftime('%H:%M:%S')}] {icon} {scope} • {passed} réussi(s), "
+              f"{failed} échoué(s) • {duration:.2f}s")
+
+        if result.returncode != 0:
+            for line in result.stdout.splitlines():
+                if '⨯' in line or 'FAILED' in line:
+                    print(f"   {line.strip()}")
+
+        return result.returncode == 0
+
+    def watch(self):
+        """Boucle principale : attend, regroupe les rafales de sauvegardes, relance"""
+        os.chdir(self.plugin_dir)
+        self.build_index()
+        watcher = create_watcher(
+            [self.src_dir, self.tests_dir],
+            [self.plugin_dir / name for name in ROOT_FILES]
+        )
+        backend = "inotify" if isinstance(watcher, InotifyWatcher) else "polling"
+
+        print(f"👀 Mode watch ({backend}) sur src/, tests/, {', '.join(ROOT_FILES)} - Ctrl+C pour quitter")
+        print("-" * 50)
+
+        try:
+            while True:
+                changed = watcher.wait()
+
+                # Debounce : regrouper les événements tant que les sauvegardes s'enchaînent
+                while True:
+                    burst = watcher.wait(self.debounce)
+                    if not burst:
+                        break
+                    changed |= burst
+
+                targets = self.affected_tests(changed)
+                if targets is not None and not targets:
+                    continue
+
+                self.run_targets(targets)
+        except KeyboardInterrupt:
+            print("\n👋 Fin du mode watch")
+        finally:
+            watcher.close()
+
+
+def main():
+    """Point d'entrée autonome"""
+    TestWatcher(Path(__file__).parent).watch()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())